@@ -0,0 +1,71 @@
+# batch_packs.py
+# Builds one idea pack per character canon, in parallel across cores.
+# Usage: python batch_packs.py canons/ [--out public/characters] [--n 80] [--keep 30] [--seed 1234]
+# Each canon file uses the cat.json schema. Creates <out>/<canon name>/ (same files
+# as public/) plus <out>/index.json and <out>/index.html listing every pack.
+# Each canon gets its own RNG stream derived from (--seed, canon name), so adding or
+# removing canons never changes the other packs; --no-history makes a seeded run
+# fully reproducible by not reading or updating the per-canon cache.
+
+import argparse, datetime, html, json, os, pathlib, zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import generate_prompts as gp
+
+def canon_rng(seed, name):
+    """Independent, reproducible stream per canon (None seed = fresh entropy)."""
+    if seed is None:
+        return gp.make_rng()
+    if gp.np is not None:
+        return gp.make_rng(gp.np.random.SeedSequence([seed, zlib.crc32(name.encode("utf-8"))]))
+    return gp.make_rng(f"{seed}:{name}")
+
+def build_canon(path, outroot, n, keep, seed, history):
+    """Worker: build and write the pack for one canon file; returns its index entry."""
+    name = pathlib.Path(path).stem
+    cat = gp.load_cat_canon(path)
+    outdir = os.path.join(outroot, name)
+    cache_dir = os.path.join(gp.CACHE_DIR, "canons", name)
+    ideas = gp.generate(n=n, keep=keep, outdir=outdir, cat=cat, cache_dir=cache_dir,
+                        rng=canon_rng(seed, name), history=history)
+    return {"name": name, "character": cat["name"], "one_liner": cat["one_liner"],
+            "ideas": len(ideas), "path": f"{name}/"}
+
+def write_index(entries, outroot):
+    ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+    with open(os.path.join(outroot, "index.json"), "w", encoding="utf-8") as f:
+        json.dump({"generated": ts, "packs": entries}, f, ensure_ascii=False, indent=2)
+    rows = "".join(
+        f'<li><a href="{html.escape(e["path"])}"><b>{html.escape(e["character"])}</b></a> '
+        f'<span class="small">— {e["ideas"]} ideas · {html.escape(e["one_liner"])}</span></li>'
+        for e in entries)
+    page = f"""<!doctype html><html><head><meta charset="utf-8"><title>Idea Packs — {ts}</title>
+<meta name="viewport" content="width=device-width,initial-scale=1">
+<style>body{{font-family:system-ui,Segoe UI,Roboto,Arial,sans-serif;max-width:900px;margin:24px auto;padding:0 16px}}
+li{{margin:8px 0}}.small{{color:#444;font-size:13px}}</style></head>
+<body><h1>Idea Packs — {ts}</h1><ul>{rows}</ul></body></html>"""
+    with open(os.path.join(outroot, "index.html"), "w", encoding="utf-8") as f:
+        f.write(page)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Build one idea pack per canon file, in parallel.")
+    ap.add_argument("canons", help="directory of canon .json files (cat.json schema)")
+    ap.add_argument("--out", default="public/characters")
+    ap.add_argument("--n", type=int, default=80, help="candidates per pack")
+    ap.add_argument("--keep", type=int, default=30, help="ideas per pack")
+    ap.add_argument("--seed", type=int, default=None, help="base seed for reproducible packs")
+    ap.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    ap.add_argument("--no-history", action="store_true", help="ignore and leave the per-canon cache untouched")
+    args = ap.parse_args(argv)
+
+    paths = sorted(str(p) for p in pathlib.Path(args.canons).glob("*.json"))
+    pathlib.Path(args.out).mkdir(parents=True, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(build_canon, p, args.out, args.n, args.keep, args.seed, not args.no_history)
+                   for p in paths]
+        entries = [f.result() for f in futures]
+    write_index(entries, args.out)
+    print(f"Wrote {len(entries)} packs to {args.out}/")
+
+if __name__ == "__main__":
+    main()
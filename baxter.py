@@ -0,0 +1,178 @@
+# baxter.py
+# One-process pipeline CLI: python baxter.py {fetch,seeds,generate,publish,all,startup}
+#   fetch     ingest snapshot (.cache/snapshot.json; reused if younger than BAXTER_SNAPSHOT_MAX_AGE)
+#   seeds     mine seeds.json from the snapshot
+#   generate  build and write the idea pack (public/)
+#   publish   write the trending page (public/trending.json, public/trending.html)
+#   all       fetch, seeds, generate, publish in one process; each stage hands its
+#             result to the next in memory instead of re-reading files
+#   startup   check that importing this CLI stays under the startup budget
+# Stages whose inputs and code are unchanged since the last run reuse their cached
+# output (stage_cache.py; --force reruns them; generate always runs, since each pack
+# advances the ledger), and the run reports whether anything needs deploying.
+# Stage modules (and numpy / requests behind them) are imported only by the
+# commands that need them, so `startup` and `--help` stay fast.
+
+import argparse, os, subprocess, sys, time
+
+STARTUP_BUDGET_MS = float(os.getenv("BAXTER_STARTUP_BUDGET_MS", "100"))
+HEAVY_MODULES = ("numpy", "requests", "ingest", "generate_prompts", "trends_to_seeds")
+
+# Repo files whose content is part of each stage's cache key (its code version)
+SOURCES = {
+    "seeds": ("trends_to_seeds.py", "trend_store.py", "themes.py"),
+    "write": ("generate_prompts.py",),
+    "publish": ("fetch_top10_trending.py", "thumbs.py"),
+}
+
+class Pipeline:
+    """State shared by the stages of one run. Stages after fetch, except generate, are
+    content-addressed (stage_cache): when their inputs and code are unchanged they reuse
+    the stored output."""
+
+    def __init__(self, outdir="public", n=80, keep=30, refresh=False, offline=False, force=False):
+        import stage_cache
+        self.outdir, self.n, self.keep = outdir, n, keep
+        self.refresh, self.offline, self.force = refresh, offline, force
+        self.snap = self.seeds = self.pack = None
+        self.cache, self.keys = stage_cache.StageCache(), {}
+
+    def snapshot(self):
+        if self.snap is None:
+            import ingest
+            self.snap = ingest.snapshot(max_age=0 if self.refresh else ingest.SNAPSHOT_MAX_AGE_S,
+                                        offline=self.offline or ingest.OFFLINE)
+        return self.snap
+
+    def snapshot_key(self):
+        # Content only: a refetch that returns the same items keeps downstream keys
+        if "fetch" not in self.keys:
+            from stage_cache import digest
+            self.keys["fetch"] = digest([{k: v for k, v in it.items() if k != "fetched_at"}
+                                         for it in self.snapshot()["items"]],
+                                        self.snap.get("stream", {}).get("digest"))
+        return self.keys["fetch"]
+
+    def cached(self, stage, *inputs):
+        """Record the stage key; returns the stored record when it can be reused."""
+        from stage_cache import code_version, digest
+        key = self.keys[stage] = digest(code_version(*SOURCES[stage]), *inputs)
+        rec = None if self.force else self.cache.get(stage, key)
+        if rec is not None:
+            import metrics
+            metrics.run.count("stage_cache.hits")
+            print(f"  {stage}: inputs unchanged, reusing cached output")
+        return rec
+
+    def fetch(self):
+        import metrics
+        self.snapshot_key()
+        metrics.run.flush("ingest", self.outdir)
+        print(f"Snapshot: {len(self.snap['items'])} items from {', '.join(self.snap['feeds']) or 'no feeds'}")
+
+    def mine(self):
+        import metrics, trends_to_seeds
+        rec = self.cached("seeds", self.snapshot_key(), trends_to_seeds.matcher().vocab)
+        if rec is not None:
+            self.seeds = rec["output"]
+        else:
+            self.seeds = trends_to_seeds.mine(self.snapshot())
+            self.cache.put("seeds", self.keys["seeds"], self.seeds)
+        trends_to_seeds.write_seeds(self.seeds)
+        metrics.run.flush("seeds", self.outdir)
+        print(f"Seeds: {self.seeds['generated_from']} items, {self.seeds['new_items']} new")
+
+    def generate(self):
+        # Never cached: each run draws a fresh pack and advances the ledger and the
+        # recent-pack history, so the same inputs must not mean the same pack
+        import generate_prompts
+        if self.seeds is not None:
+            generate_prompts.use_seeds(self.seeds)
+        self.pack = generate_prompts.build_with_history(n=self.n, keep=self.keep)
+        print(f"Pack: {len(self.pack)} ideas")
+
+    def write(self):
+        import generate_prompts
+        if not self.pack:
+            # Fail the run rather than deploy an empty page (see generate_prompts.EmptyPack)
+            sys.exit("Pack is empty: not writing or deploying it")
+        if self.cached("write", self.pack, generate_prompts.patterns(), generate_prompts.canon(), self.outdir) is None:
+            generate_prompts.write_with_metrics(self.pack, self.outdir)
+            self.cache.put("write", self.keys["write"], files=generate_prompts.pack_files(self.outdir))
+            print(f"Wrote the pack to {self.outdir}/")
+
+    def publish(self):
+        import fetch_top10_trending
+        fetch_top10_trending.OUTDIR = self.outdir
+        if self.cached("publish", self.snapshot_key()) is None:
+            out = fetch_top10_trending.publish(self.snapshot()["items"])
+            tdir = os.path.join(self.outdir, "thumbs")
+            files = [os.path.join(self.outdir, f) for f in ("trending.json", "trending.html")]
+            files += [os.path.join(tdir, f) for f in sorted(os.listdir(tdir))] if os.path.isdir(tdir) else []
+            self.cache.put("publish", self.keys["publish"], files=files)
+            print(f"Trending: {len(out['youtube'])} YouTube, {len(out['reddit'])} Reddit")
+
+    def report(self, command):
+        """Compare the published stages' keys with the last run of `command`; returns whether
+        anything changed (also written to $GITHUB_OUTPUT as changed=true/false)."""
+        from stage_cache import digest
+        published = {k: self.keys[k] for k in ("write", "publish") if k in self.keys}
+        if not published:
+            return True
+        key = digest(published)
+        last = self.cache.load("deploy-" + command)
+        changed = self.force or not last or last.get("key") != key
+        self.cache.put("deploy-" + command, key)
+        print("Outputs changed; deploy." if changed else "Nothing changed since the last run; nothing to deploy.")
+        if os.getenv("GITHUB_OUTPUT"):
+            with open(os.environ["GITHUB_OUTPUT"], "a", encoding="utf-8") as f:
+                f.write(f"changed={'true' if changed else 'false'}\n")
+        return changed
+
+STAGES = {"fetch": ["fetch"], "seeds": ["mine"], "generate": ["generate", "write"], "publish": ["publish"],
+          "all": ["fetch", "mine", "generate", "write", "publish"]}
+
+def startup_ms(runs=5):
+    """Best-of-`runs` time to import this module and build its parser in a fresh
+    interpreter, plus the heavy modules that import pulled in."""
+    probe = ("import sys, time; t = time.perf_counter(); import baxter; baxter.build_parser(); "
+             "print((time.perf_counter() - t) * 1000); "
+             "print(' '.join(m for m in baxter.HEAVY_MODULES if m in sys.modules))")
+    here = os.path.dirname(os.path.abspath(__file__))
+    best, heavy = float("inf"), ""
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", probe], cwd=here, capture_output=True,
+                             text=True, check=True).stdout.split("\n")
+        best, heavy = min(best, float(out[0])), out[1].strip()
+    return best, heavy.split()
+
+def check_startup(budget_ms):
+    ms, heavy = startup_ms()
+    print(f"Startup: {ms:.1f} ms (budget {budget_ms:.0f} ms)" + (f"; imported at startup: {', '.join(heavy)}" if heavy else ""))
+    return ms <= budget_ms and not heavy
+
+def build_parser():
+    ap = argparse.ArgumentParser(prog="baxter", description="Baxter idea-pack pipeline.")
+    ap.add_argument("command", choices=list(STAGES) + ["startup"])
+    ap.add_argument("--out", default="public", help="output directory for the pack and pages")
+    ap.add_argument("--n", type=int, default=80, help="candidates to generate")
+    ap.add_argument("--keep", type=int, default=30, help="ideas to keep")
+    ap.add_argument("--refresh", action="store_true", help="fetch even if the snapshot is recent")
+    ap.add_argument("--offline", action="store_true", help="use the cached snapshot, never the network")
+    ap.add_argument("--force", action="store_true", help="rerun every stage even if its inputs are unchanged")
+    ap.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS, help="startup budget for `startup`")
+    return ap
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "startup":
+        sys.exit(0 if check_startup(args.budget_ms) else 1)
+    p = Pipeline(args.out, args.n, args.keep, args.refresh, args.offline, args.force)
+    for stage in STAGES[args.command]:
+        t0 = time.perf_counter()
+        getattr(p, stage)()
+        print(f"  {stage}: {time.perf_counter() - t0:.2f}s")
+    p.report(args.command)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# bench_hotpaths.py
+# Benchmarks the generation and trend-mining hot paths on synthetic fixtures.
+# Usage: python bench_hotpaths.py [--quick] [--out bench_results.json] [--compare old.json]
+# Run from the repo root (generate_prompts reads cat.json/seeds.json, trends_to_seeds
+# reads trend_vocab.json). For every stage and scale it records seconds (best of
+# --repeat), items/s, peak traced memory and output bytes, and writes them as JSON.
+# --compare prints the ratio to an earlier results file and exits 1 on a slowdown
+# beyond --tolerance.
+
+import argparse, datetime, json, os, platform, random, subprocess, sys, tempfile, time, tracemalloc
+
+import generate_prompts as gp
+import themes
+import trends_to_seeds as tts
+
+POOL_SCALES = [10**2, 10**3, 10**4, 10**5, 10**6]
+TITLE_SCALES = [10**2, 10**3, 10**4, 10**5]
+QUICK_MAX = 10**4
+# Stages that hold one rendered idea (~2.5 KB) per item stop here; the
+# index-space stages (score_rows, build_pack) go all the way up
+RENDER_MAX = 10**4
+FILLER = ("cat boss when the intern finally my day at this is why we can't have nice things "
+          "watch until the end he really did that no way caught on camera").split()
+
+# ---------- fixtures ----------
+def fixture_rows(n, seed=0):
+    return gp.sample_indices(n, gp.make_rng(seed))
+
+def fixture_ideas(n, seed=0):
+    return [gp.render_idea(row) for row in fixture_rows(n, seed)]
+
+def fixture_titles(n, seed=0):
+    """Trending-like items: filler words with a vocabulary needle in about half the titles."""
+    rnd = random.Random(seed)
+    needles = [nd for spec in tts.matcher().vocab.values() for ns in spec["terms"].values() for nd in ns]
+    out = []
+    for i in range(n):
+        words = rnd.sample(FILLER, 8)
+        if rnd.random() < 0.5:
+            words.insert(rnd.randrange(len(words)), rnd.choice(needles))
+        out.append({"title": " ".join(words), "desc": "", "score": rnd.randrange(10**5),
+                    "views": rnd.randrange(10**7), "key": f"bench:{i}"})
+    return out
+
+def dir_bytes(path):
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, fs in os.walk(path) for f in fs)
+
+def json_bytes(obj):
+    return len(json.dumps(obj, ensure_ascii=False).encode("utf-8"))
+
+# ---------- stages ----------
+# Each stage: (name, scales, setup(n) -> state, run(state) -> output bytes).
+def _tmpdir(n):
+    # Removed when the state is dropped
+    return {"ideas": fixture_ideas(n), "tmp": tempfile.TemporaryDirectory(prefix="baxter-bench-")}
+
+def _write(s):
+    gp.write_pack(s["ideas"], s["tmp"].name)
+    return dir_bytes(s["tmp"].name)
+
+STAGES = [
+    ("build_idea", POOL_SCALES, lambda n: n,
+     lambda n: json_bytes([gp.build_idea() for _ in range(n)])),
+    ("score_idea", POOL_SCALES, fixture_ideas,
+     lambda ideas: json_bytes([gp.score_idea(it) for it in ideas])),
+    ("dedupe_keep_first", POOL_SCALES, fixture_ideas,
+     lambda ideas: json_bytes(gp.dedupe_keep_first(ideas, "title"))),
+    ("score_rows", POOL_SCALES, lambda n: (fixture_rows(n), gp.score_tables()),
+     lambda s: len(gp.score_rows(*s)) * 8),
+    ("build_pack", POOL_SCALES, lambda n: n,
+     lambda n: json_bytes(gp.build_pack(n=n, keep=30, rng=gp.make_rng(0)))),
+    ("write_pack", POOL_SCALES, _tmpdir, _write),
+    ("extract_patterns", TITLE_SCALES, fixture_titles,
+     lambda items: json_bytes(tts.extract_patterns(items))),
+    ("mine_themes", TITLE_SCALES, lambda n: [it["title"] for it in fixture_titles(n)],
+     lambda texts: json_bytes(themes.mine(texts))),
+]
+
+def measure(setup, run, n, repeat):
+    state = setup(n)
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out_bytes = run(state)
+        best = min(best, time.perf_counter() - t0)
+    # Memory in a separate pass: tracemalloc slows the code it traces
+    tracemalloc.start()
+    run(state)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"seconds": round(best, 6), "items_per_s": round(n / best, 1) if best else None,
+            "peak_bytes": peak, "output_bytes": out_bytes}
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, timeout=5).stdout.strip()
+    except Exception:
+        commit = ""
+    return {"timestamp": datetime.datetime.now().isoformat(timespec="seconds"), "commit": commit,
+            "python": platform.python_version(), "numpy": getattr(gp.np, "__version__", None),
+            "machine": platform.machine()}
+
+def compare(results, old_path, tolerance):
+    """Print new/old seconds per (stage, n); returns the rows slower than 1 + tolerance."""
+    with open(old_path, "r", encoding="utf-8") as f:
+        old = {(r["stage"], r["n"]): r for r in json.load(f)["results"]}
+    slower = []
+    for r in results:
+        o = old.get((r["stage"], r["n"]))
+        if not o or not o["seconds"]:
+            continue
+        ratio = r["seconds"] / o["seconds"]
+        flag = "  SLOWER" if ratio > 1 + tolerance else ""
+        print(f"{r['stage']:<18} n={r['n']:<8} {o['seconds']:.4f}s -> {r['seconds']:.4f}s  x{ratio:.2f}{flag}")
+        if flag:
+            slower.append(r)
+    return slower
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark the pack generation and trend-mining hot paths.")
+    ap.add_argument("--out", default="bench_results.json")
+    ap.add_argument("--quick", action="store_true", help=f"stop every stage at n={QUICK_MAX}")
+    ap.add_argument("--stage", action="append", help="only these stages (repeatable)")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--compare", help="earlier results file to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before flagging")
+    args = ap.parse_args(argv)
+
+    results = []
+    for name, scales, setup, run in STAGES:
+        if args.stage and name not in args.stage:
+            continue
+        for n in scales:
+            if args.quick and n > QUICK_MAX:
+                break
+            if name not in ("build_pack", "score_rows", "extract_patterns", "mine_themes") and n > RENDER_MAX:
+                break
+            r = dict(stage=name, n=n, **measure(setup, run, n, args.repeat))
+            results.append(r)
+            print(f"{name:<18} n={n:<8} {r['seconds']:.4f}s  {r['items_per_s']:>12,.0f}/s  "
+                  f"peak {r['peak_bytes'] / 2**20:7.1f} MiB  out {r['output_bytes']:,} B", flush=True)
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2)
+    print(f"Wrote {args.out}")
+    if args.compare and compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
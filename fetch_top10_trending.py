@@ -1,103 +1,55 @@
 # fetch_top10_trending.py
 # Creates: public/trending.json and public/trending.html
-# Needs: YOUTUBE_API_KEY (required for YouTube section), Reddit secrets optional.
+# Reads the ingest snapshot (see ingest.py); YOUTUBE_API_KEY is needed there for the YouTube section.
 
-import os, json, datetime as dt, requests, re, pathlib
+import os, json, datetime as dt, re, pathlib
 from typing import List, Dict
 
-YOUTUBE_KEY = os.getenv("YOUTUBE_API_KEY")
-
-# Optional Reddit (we'll only use it if creds exist)
-REDDIT_ID = os.getenv("REDDIT_CLIENT_ID")
-REDDIT_SECRET = os.getenv("REDDIT_CLIENT_SECRET")
-REDDIT_UA = os.getenv("REDDIT_USER_AGENT", "baxter-trends/1.0")
+import ingest, metrics, thumbs
 
 OUTDIR = "public"
-pathlib.Path(OUTDIR).mkdir(parents=True, exist_ok=True)
-
-def iso_24h_ago():
-    t = dt.datetime.utcnow() - dt.timedelta(days=1)
-    return t.replace(microsecond=0).isoformat("T") + "Z"
-
-def yt_top10_funny_last24h() -> List[Dict]:
-    if not YOUTUBE_KEY:
-        return []
-    base_search = "https://www.googleapis.com/youtube/v3/search"
-    base_videos = "https://www.googleapis.com/youtube/v3/videos"
-    params = {
-        "part": "snippet",
-        "type": "video",
-        "q": "funny OR comedy",
-        "order": "viewCount",
-        "maxResults": 50,
-        "videoDuration": "short",    # < 4 minutes; we’ll still pick the funniest/most-viewed
-        "publishedAfter": iso_24h_ago(),
-        "regionCode": "US",
-        "relevanceLanguage": "en",
-        "key": YOUTUBE_KEY
-    }
-    r = requests.get(base_search, params=params, timeout=20)
-    r.raise_for_status()
-    items = r.json().get("items", [])
-    ids = [it["id"]["videoId"] for it in items if "id" in it and "videoId" in it["id"]]
-    if not ids:
-        return []
-    # Get stats for view counts
-    r2 = requests.get(base_videos, params={
-        "part": "snippet,contentDetails,statistics",
-        "id": ",".join(ids),
-        "key": YOUTUBE_KEY
-    }, timeout=20)
-    r2.raise_for_status()
+
+def yt_top10_funny_last24h(items: List[Dict]) -> List[Dict]:
     vids = []
-    for v in r2.json().get("items", []):
-        vid = {
+    for v in items:
+        if "yt_search" not in v.get("feeds", []):
+            continue
+        vids.append({
             "platform": "youtube",
             "id": v["id"],
-            "title": v["snippet"]["title"],
-            "channel": v["snippet"]["channelTitle"],
-            "views": int(v.get("statistics", {}).get("viewCount", 0)),
-            "url": f"https://www.youtube.com/watch?v={v['id']}",
-            "thumb": f"https://img.youtube.com/vi/{v['id']}/hqdefault.jpg",
-            "publishedAt": v["snippet"].get("publishedAt", "")
-        }
-        vids.append(vid)
+            "title": v["title"],
+            "channel": v["channel"],
+            "views": v["views"],
+            "url": v["url"],
+            "thumb": v["thumb"],
+            "publishedAt": v["published_at"]
+        })
     vids.sort(key=lambda x: x["views"], reverse=True)
     return vids[:10]
 
-def reddit_top_funny_last_day() -> List[Dict]:
-    # Lightweight, no PRAW (so it runs even without deps). Uses Reddit JSON.
-    # If you have secrets, it’s still fine; this endpoint is public.
-    subs = ["funny", "funnyvideos", "ContagiousLaughter", "MadeMeSmile"]
+def reddit_top_funny_last_day(items: List[Dict], subs=ingest.REDDIT_SUBS) -> List[Dict]:
     out = []
-    for s in subs:
-        url = f"https://www.reddit.com/r/{s}/top.json?t=day&limit=25"
-        try:
-            r = requests.get(url, headers={"User-Agent": REDDIT_UA}, timeout=15)
-            data = r.json().get("data", {}).get("children", [])
-            for c in data:
-                p = c.get("data", {})
-                title = p.get("title", "")
-                link = "https://redd.it/" + p.get("id", "")
-                # Prefer posts that look like short videos (yt or v.redd.it)
-                domain = p.get("domain", "")
-                is_videoish = ("youtube" in domain) or ("youtu.be" in domain) or ("v.redd.it" in domain)
-                out.append({
-                    "platform": "reddit",
-                    "subreddit": s,
-                    "title": title,
-                    "score": p.get("score", 0),
-                    "url": link,
-                    "domain": domain,
-                    "is_video": bool(is_videoish)
-                })
-        except Exception:
+    for p in items:
+        if p["platform"] != "reddit" or p.get("subreddit") not in subs:
             continue
+        # Prefer posts that look like short videos (yt or v.redd.it)
+        domain = p["domain"]
+        is_videoish = ("youtube" in domain) or ("youtu.be" in domain) or ("v.redd.it" in domain)
+        out.append({
+            "platform": "reddit",
+            "subreddit": p["subreddit"],
+            "title": p["title"],
+            "score": p["score"],
+            "url": p["url"],
+            "domain": domain,
+            "is_video": bool(is_videoish)
+        })
     # Prioritize items that are likely videos, then by score
     out.sort(key=lambda x: (not x["is_video"], -int(x.get("score", 0))))
     return out[:10]
 
 def write_outputs(data: Dict):
+    pathlib.Path(OUTDIR).mkdir(parents=True, exist_ok=True)
     # JSON
     with open(os.path.join(OUTDIR, "trending.json"), "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
@@ -106,10 +58,19 @@ def write_outputs(data: Dict):
     ts = dt.datetime.now().strftime("%Y-%m-%d %H:%M")
     yt = data.get("youtube", [])
     rd = data.get("reddit", [])
+    # Local resized WebP thumbnails (or one sprite); hotlinked small JPEGs as fallback
+    local = thumbs.local_thumbs([v["id"] for v in yt], OUTDIR)
+    def thumb(v):
+        t = local.get(v["id"])
+        if t and "sprite" in t:
+            return f'<div class="thumb" style="background:url({t["sprite"]}) 0 -{t["y"]}px" role="img" aria-label="thumb"></div>'
+        src = t["src"] if t else thumbs.hotlink(v["id"])
+        return f'<img src="{src}" alt="thumb" width="{thumbs.THUMB_W}" height="{thumbs.THUMB_H}" loading="lazy" decoding="async" />'
+
     def yt_card(v):
         return f"""
         <div class="card">
-          <img src="{v['thumb']}" alt="thumb" />
+          {thumb(v)}
           <div>
             <b>{v['title']}</b><br/>
             <span class="small">Channel: {v.get('channel','?')} • Views: {v.get('views',0):,}</span><br/>
@@ -135,7 +96,7 @@ body{{font-family:system-ui,Segoe UI,Roboto,Arial,sans-serif;max-width:1000px;ma
 h1{{margin:0 0 8px}} .small{{color:#555;font-size:13px}}
 .grid{{display:grid;grid-template-columns:1fr;gap:12px}}
 .card{{display:flex;gap:12px;border:1px solid #ddd;border-radius:12px;padding:12px;align-items:flex-start}}
-.card img{{width:160px;height:90px;object-fit:cover;border-radius:8px;border:1px solid #ccc}}
+.card img,.card .thumb{{width:160px;height:90px;flex:none;object-fit:cover;border-radius:8px;border:1px solid #ccc}}
 .section{{margin-top:24px}}
 </style>
 <h1>Top 10 Funny — Last 24h</h1>
@@ -160,17 +121,26 @@ h1{{margin:0 0 8px}} .small{{color:#555;font-size:13px}}
     with open(os.path.join(OUTDIR, "trending.html"), "w", encoding="utf-8") as f:
         f.write(html)
 
+def publish(items: List[Dict]) -> Dict:
+    """Select the top 10s from snapshot items, write the trending page and its metrics."""
+    with metrics.run.stage("select"):
+        out = {"youtube": yt_top10_funny_last24h(items), "reddit": reddit_top_funny_last_day(items)}
+    with metrics.run.stage("write"):
+        write_outputs(out)
+    metrics.run.set("items.snapshot", len(items))
+    for k in out:
+        metrics.run.set(f"items.kept.{k}", len(out[k]))
+    metrics.run.set("items.dropped", len(items) - sum(len(v) for v in out.values()))
+    for name in ("trending.json", "trending.html"):
+        metrics.run.set(f"bytes.{name}", os.path.getsize(os.path.join(OUTDIR, name)))
+    metrics.run.flush("trending", OUTDIR)
+    return out
+
 def main():
-    out = {}
-    try:
-        out["youtube"] = yt_top10_funny_last24h()
-    except Exception as e:
-        out["youtube"] = []
-    try:
-        out["reddit"] = reddit_top_funny_last_day()
-    except Exception as e:
-        out["reddit"] = []
-    write_outputs(out)
+    # Runs off the shared ingest snapshot (fetched here only if missing or stale)
+    with metrics.run.stage("snapshot"):
+        items = ingest.snapshot()["items"]
+    publish(items)
     print("Wrote public/trending.json and public/trending.html")
 
 if __name__ == "__main__":
@@ -1,6 +1,12 @@
-import json, random, datetime, os, pathlib
+import argparse, json, random, datetime, os, pathlib, heapq, string, hashlib, gzip, sys
+import neardup, ledger, metrics
 random.seed()
 
+try:
+  import numpy as np  # optional: vectorised candidate sampling
+except ImportError:
+  np = None
+
 # ---------- load cat canon ----------
 def load_cat_canon(path="cat.json"):
   default = {
@@ -22,7 +28,13 @@ def load_cat_canon(path="cat.json"):
       pass
   return default
 
-CAT = load_cat_canon()
+_cat = None
+
+def canon():
+  """The canon from cat.json, read on first use (not at import)."""
+  global _cat
+  if _cat is None: _cat = load_cat_canon()
+  return _cat
 
 # ---------- load seeds (from trends_to_seeds.py) ----------
 def load_seeds(path="seeds.json"):
@@ -33,12 +45,20 @@ def load_seeds(path="seeds.json"):
       return None
   return None
 
-SEEDS = load_seeds()
-patterns = (SEEDS or {}).get("patterns", {})
+_seeds = _patterns = None
+
+def use_seeds(seeds):
+  """Seed the component lists from an in-memory seeds dict instead of seeds.json."""
+  global _seeds, _patterns
+  _seeds, _patterns = seeds, (seeds or {}).get("patterns", {})
+
+def patterns():
+  if _patterns is None: use_seeds(load_seeds())
+  return _patterns
 
 # Helper that prefers seeds but falls back to defaults
 def seeded(fallback_list, key):
-  vals = patterns.get(key) or []
+  vals = patterns().get(key) or []
   return vals if vals else fallback_list
 
 # ---------- base fallbacks (used if no seeds) ----------
@@ -55,22 +75,34 @@ FALLBACK_PROPS = [
 FALLBACK_FORMATS = ["prank / bait-and-switch"]
 FALLBACK_HOOKS   = ["POV-style cold open"]
 
-# ---------- lists actually used (seed-aware) ----------
-NYC_SETTINGS = seeded(FALLBACK_SETTINGS, "settings")
-PROPS        = seeded(FALLBACK_PROPS,    "objects")
-FORMATS      = seeded(FALLBACK_FORMATS,  "formats")
-HOOKS        = seeded(FALLBACK_HOOKS,    "hooks")
+# ---------- lists actually used (seed-aware, resolved on first use) ----------
+SEEDED_LISTS = {
+  "NYC_SETTINGS": (FALLBACK_SETTINGS, "settings"),
+  "PROPS":        (FALLBACK_PROPS,    "objects"),
+  "FORMATS":      (FALLBACK_FORMATS,  "formats"),
+  "HOOKS":        (FALLBACK_HOOKS,    "hooks"),
+}
+
+def __getattr__(name):
+  # Keeps CAT, SEEDS, NYC_SETTINGS, ... working as module attributes without import-time I/O
+  if name == "CAT": return canon()
+  if name == "SEEDS":
+    patterns()
+    return _seeds
+  if name in SEEDED_LISTS: return seeded(*SEEDED_LISTS[name])
+  raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
+# Values and templates name the character as {short_name} (see short_name())
 PRANKS = [
-  ("Decoy Button", "Baxter places a sticky note labeled 'ANY KEY' on a keyboard"),
-  ("Chair Swap", "Baxter replaces a squeaky chair with a comically tiny stool"),
-  ("Meeting Timer", "Baxter sets an oversized sand timer in the boardroom"),
-  ("VIP Rope", "Baxter adds a velvet rope around his espresso cup"),
-  ("Auto-Approve", "Baxter stamps 'APPROVED' on blank paper, deadpan"),
-  ("Door Close", "Baxter sticks a polite 'DOOR CLOSE (faster)' label"),
-  ("Reserved Seat", "Baxter marks a chair 'For Baxter Only' with a tidy placard"),
-  ("Snack Audit", "Baxter inventories snacks with a tiny clipboard, very serious"),
-  ("Ghost Typist", "Baxter sets a fan so papers slide like ‘invisible typing’")
+  ("Decoy Button", "{short_name} places a sticky note labeled 'ANY KEY' on a keyboard"),
+  ("Chair Swap", "{short_name} replaces a squeaky chair with a comically tiny stool"),
+  ("Meeting Timer", "{short_name} sets an oversized sand timer in the boardroom"),
+  ("VIP Rope", "{short_name} adds a velvet rope around the espresso cup"),
+  ("Auto-Approve", "{short_name} stamps 'APPROVED' on blank paper, deadpan"),
+  ("Door Close", "{short_name} sticks a polite 'DOOR CLOSE (faster)' label"),
+  ("Reserved Seat", "{short_name} marks a chair 'For {short_name} Only' with a tidy placard"),
+  ("Snack Audit", "{short_name} inventories snacks with a tiny clipboard, very serious"),
+  ("Ghost Typist", "{short_name} sets a fan so papers slide like ‘invisible typing’")
 ]
 
 COMEDY_DEVICES = [
@@ -90,58 +122,182 @@ CAMERA = [
   "handheld, mild jitter; whip-pan to reaction"
 ]
 
-def tiny_caption(opts): return random.choice(opts)
 CAPTIONS_SETUP  = ["Quarterly efficiencies","Operational excellence","Executive initiative","Q3 morale booster","Pilot program","Beta test"]
 CAPTIONS_TWIST  = ["Approved.","Request denied.","Morale: up.","It worked.","As planned.","Budget neutral."]
 CAPTIONS_BUTTON = ["Meeting adjourned.","Carry on.","Next item.","Noted.","We’re done here."]
 
-def build_idea():
-  setting = random.choice(NYC_SETTINGS)
-  prank_name, prank_setup = random.choice(PRANKS)
-  prop = random.choice(PROPS)
-  device = random.choice(COMEDY_DEVICES)
-  hook = random.choice(HOOKS)
-  format_hint = random.choice(FORMATS)
-  duration = random.choice([11,12,13,14,15,16,17,18,19,20])
-
-  title = f"Baxter’s {prank_name} — {format_hint.title()}"
-  setup = (f"Wide ({hook}): {setting}. Baxter ({CAT['coat']}, {CAT['accessories']}) prepares a prank: "
-           f"{prank_setup}. On-screen caption (intercom ping): “{tiny_caption(CAPTIONS_SETUP)}”.")
-  esc1 = (f"Medium: First pass works mildly; a human hesitates; Baxter performs a "
-          f"{random.choice(CAT['signature_moves'])}. Rule-of-three begins with small success.")
-  esc2 = (f"Medium: Second pass escalates: add a {prop} to sell it. Confidence rises; Baxter’s tail flicks once.")
-  twist = (f"Close: Bait-and-switch twist: "
-           f"{random.choice(['the prank backfires elegantly on Baxter','an accidental real approval happens','the sign becomes true by coincidence','security camera pans to reveal Baxter’s tidy toolkit'])}. "
-           f"On-screen caption: “{tiny_caption(CAPTIONS_TWIST)}”.")
-  button = (f"Insert: Baxter does a tiny {random.choice(['approving nod','dramatic espresso sip'])}; "
-            f"intercom pings a final card: “{tiny_caption(CAPTIONS_BUTTON)}”.")
-  beats = [setup, esc1, esc2, twist, button]
-
-  prompt_for_sora = (
-    f"title: {title}\n"
-    f"character: {CAT['name']} — {CAT['coat']}, {CAT['eyes']}, {CAT['size']}; accessories: {CAT['accessories']}\n"
-    f"personality: {CAT['personality']}; voice: {CAT['voice']} (any words appear only as brief on-screen captions/intercom text)\n"
-    f"setup: {setup}\nbeat_2: {esc1}\nbeat_3: {esc2}\ntwist: {twist}\nbutton: {button}\n"
-    f"camera: {random.choice(CAMERA)}\n"
-    f"audio: {random.choice(AUDIO)}\n"
-    f"duration_s: {duration}\naspect_ratio: 16:9\n"
-    "Continuity: single cat only; simple readable motion; no tiny text; avoid crowds and brands."
-  )
+TWIST_OUTCOMES = [
+  "the prank backfires elegantly on {short_name}", "an accidental real approval happens",
+  "the sign becomes true by coincidence", "security camera pans to reveal {short_name}’s tidy toolkit"
+]
+BUTTON_MOVES = ["approving nod","dramatic espresso sip"]
+DURATIONS = [11,12,13,14,15,16,17,18,19,20]
+
+# ---------- templates (filled only for ideas we keep) ----------
+TITLE_TEMPLATE = "{short_name}’s {prank_name} — {format_title}"
+BEATS = [
+  ("setup",  "Wide ({hook}): {setting}. {short_name} ({coat}, {accessories}) prepares a prank: "
+             "{prank_setup}. On-screen caption (intercom ping): “{caption_setup}”."),
+  ("beat_2", "Medium: First pass works mildly; a human hesitates; {short_name} performs a "
+             "{move}. Rule-of-three begins with small success."),
+  ("beat_3", "Medium: Second pass escalates: add a {prop} to sell it. Confidence rises; {short_name}’s tail flicks once."),
+  ("twist",  "Close: Bait-and-switch twist: {outcome}. On-screen caption: “{caption_twist}”."),
+  ("button", "Insert: {short_name} does a tiny {button_move}; intercom pings a final card: “{caption_button}”."),
+]
+PROMPT_TEMPLATE = (
+  "title: {title}\n"
+  "character: {name} — {coat}, {eyes}, {size}; accessories: {accessories}\n"
+  "personality: {personality}; voice: {voice} (any words appear only as brief on-screen captions/intercom text)\n"
+  "setup: {setup}\nbeat_2: {beat_2}\nbeat_3: {beat_3}\ntwist: {twist}\nbutton: {button}\n"
+  "camera: {camera}\n"
+  "audio: {audio}\n"
+  "duration_s: {duration}\naspect_ratio: 16:9\n"
+  "Continuity: single cat only; simple readable motion; no tiny text; avoid crowds and brands."
+)
+
+# ---------- index space ----------
+# A candidate is a row of indices, one per component list. Sampling, scoring and
+# dedupe work on rows; render_idea() turns a row into text only for kept ideas.
+def short_name(cat):
+  """What titles and beats call the character: the canon's short_name, else the first word of its name."""
+  return cat.get("short_name") or cat["name"].split()[0]
+
+def named(values, cat):
+  """`values` (strings or tuples of strings) with {short_name} filled in."""
+  short = short_name(cat)
+  fill = lambda v: tuple(fill(x) for x in v) if isinstance(v, tuple) else v.replace("{short_name}", short)
+  return [fill(v) for v in values]
+
+# The single source of the row layout: the ledger's mixed-radix IDs, the shards and
+# index.html (via pack_manifest) all address components by position in this order.
+COLUMNS = ("setting", "prank", "prop", "device", "hook", "format",
+           "caption_setup", "caption_twist", "caption_button", "camera", "audio", "duration",
+           "move", "outcome", "button_move")
+
+def component_lists(cat=None):
+  """[(column name, values)] in COLUMNS order."""
+  cat = cat or canon()
+  return list(zip(COLUMNS, [
+    seeded(FALLBACK_SETTINGS, "settings"), named(PRANKS, cat), seeded(FALLBACK_PROPS, "objects"),
+    COMEDY_DEVICES, seeded(FALLBACK_HOOKS, "hooks"), seeded(FALLBACK_FORMATS, "formats"),
+    CAPTIONS_SETUP, CAPTIONS_TWIST, CAPTIONS_BUTTON,
+    CAMERA, AUDIO, DURATIONS,
+    cat["signature_moves"], named(TWIST_OUTCOMES, cat), BUTTON_MOVES,
+  ], strict=True))
+
+def make_rng(seed=None):
+  return np.random.default_rng(seed) if np is not None else random.Random(seed)
+
+def sample_indices(n, rng=None, cat=None):
+  """n candidate rows: an (n, len(COLUMNS)) int array with NumPy, else a list of tuples."""
+  sizes = [len(vals) for _,vals in component_lists(cat)]
+  rng = rng or make_rng()
+  if np is not None:
+    out = np.empty((n, len(sizes)), dtype=np.int64)
+    for j,s in enumerate(sizes):
+      out[:,j] = rng.integers(0, s, size=n)
+    return out
+  return [tuple(rng.randrange(s) for s in sizes) for _ in range(n)]
+
+def column_fields(name, val):
+  """Template fields filled by one component value."""
+  if name == "prank": return {"prank_name": val[0], "prank_setup": val[1]}
+  if name == "format": return {"format": val, "format_title": val.title()}
+  return {name: val}
+
+def cat_fields(cat=None):
+  cat = cat or canon()
+  return dict({k: cat[k] for k in ("name","coat","eyes","size","accessories","personality","voice")},
+              short_name=short_name(cat))
+
+def idea_values(row, cat=None, lists=None):
+  v = cat_fields(cat)
+  for (name,vals),i in zip(lists or component_lists(cat), row):
+    v.update(column_fields(name, vals[int(i)]))
+  return v
+
+def render_beats(v):
+  return [tpl.format(**v) for _,tpl in BEATS]
+
+def render_idea(row, cat=None, lists=None):
+  v = idea_values(row, cat, lists)
+  title = TITLE_TEMPLATE.format(**v)
+  beats = render_beats(v)
+  prompt_for_sora = PROMPT_TEMPLATE.format(title=title, **dict(zip([k for k,_ in BEATS], beats)), **v)
   return {
     "title": title, "style": "prank-forward deadpan office comedy",
-    "beats": beats, "device": device,
-    "duration_s": duration, "aspect_ratio": "16:9",
-    "prompt_for_sora": prompt_for_sora
+    "beats": beats, "device": v["device"],
+    "duration_s": v["duration"], "aspect_ratio": "16:9",
+    "prompt_for_sora": prompt_for_sora,
+    "components": [int(i) for i in row]
   }
 
+def build_idea():
+  # One idea: the module-level `random` is far cheaper than a fresh NumPy generator here
+  lists = component_lists()
+  return render_idea([int(random.random() * len(vals)) for _,vals in lists], lists=lists)
+
+# ---------- scoring ----------
+# (points, needles): points if any needle appears in the lowercased beats.
+SCORE_RULES = [
+  (2, ("escalat","rule-of-three")),
+  (2, ("prank",)),
+  (1, ("elevator","boardroom","bodega","subway","wall street","midtown")),
+]
+
+def score_structure(prompt_txt):
+  return 2 if "setup:" in prompt_txt and "twist:" in prompt_txt else 0
+
+def feature_mask(txt):
+  txt = txt.lower()
+  return sum(1 << b for b,(_,needles) in enumerate(SCORE_RULES) if any(k in txt for k in needles))
+
+def mask_points(mask):
+  return sum(pts for b,(pts,_) in enumerate(SCORE_RULES) if mask >> b & 1)
+
+def score_text(beats_txt, prompt_txt):
+  return score_structure(prompt_txt) + mask_points(feature_mask(beats_txt))
+
 def score_idea(idea):
-  s = 0
-  txt = " ".join(idea["beats"]).lower()
-  if "setup:" in idea["prompt_for_sora"] and "twist:" in idea["prompt_for_sora"]: s += 2
-  if "escalat" in txt or "rule-of-three" in txt: s += 2
-  if "prank" in txt: s += 2
-  if any(k in txt for k in ["elevator","boardroom","bodega","subway","wall street","midtown"]): s += 1
-  return s
+  return score_text(" ".join(idea["beats"]), idea["prompt_for_sora"])
+
+BEAT_FIELDS = {f for _,tpl in BEATS for _,f,_,_ in string.Formatter().parse(tpl) if f}
+
+def score_tables(cat=None):
+  """Precompute each component's contribution so scoring a row is a few ORs and a lookup.
+
+  Returns (base, cols, lut): `base` is the feature mask of the fixed beat text,
+  cols[j][i] the mask of value i of column j, lut[mask] the points for a mask.
+  """
+  fixed = {f: "|" for f in BEAT_FIELDS}
+  fixed.update(cat_fields(cat))
+  base = feature_mask(" ".join(tpl.format(**fixed) for _,tpl in BEATS))
+  cols = []
+  for name,vals in component_lists(cat):
+    col = []
+    for val in vals:
+      fields = column_fields(name, val)
+      col.append(feature_mask(" | ".join(str(fields[f]) for f in fields if f in BEAT_FIELDS)))
+    cols.append(col)
+  lut = [score_structure(PROMPT_TEMPLATE) + mask_points(m) for m in range(1 << len(SCORE_RULES))]
+  if np is not None:
+    cols = [np.asarray(c, dtype=np.int64) for c in cols]
+    lut = np.asarray(lut, dtype=np.int64)
+  return base, cols, lut
+
+def score_rows(rows, tables):
+  base, cols, lut = tables
+  if np is not None:
+    m = np.full(len(rows), base, dtype=np.int64)
+    for j,col in enumerate(cols):
+      m |= col[rows[:,j]]
+    return lut[m]
+  out = []
+  for row in rows:
+    m = base
+    for col,i in zip(cols, row): m |= col[i]
+    out.append(lut[m])
+  return out
 
 def dedupe_keep_first(items, key):
   seen=set(); out=[]
@@ -151,45 +307,407 @@ def dedupe_keep_first(items, key):
     seen.add(k); out.append(it)
   return out
 
-def build_pack(n=80, keep=30):
-  pool = [build_idea() for _ in range(n)]
-  pool = dedupe_keep_first(pool, "title")
-  pool.sort(key=score_idea, reverse=True)
-  return pool[:keep]
+# ---------- near-duplicate filter ----------
+# Prompts share the canon and template text, so similarity is measured on the
+# shingles of what varies: each prompt field filled by a component value.
+NEAR_DUP_THRESHOLD = 0.7
+CACHE_DIR = os.getenv("BAXTER_CACHE_DIR", ".cache")
+MINHASH = neardup.MinHasher()
+
+PROMPT_FIELDS = {f for tpl in [TITLE_TEMPLATE, PROMPT_TEMPLATE] + [t for _,t in BEATS]
+                 for _,f,_,_ in string.Formatter().parse(tpl) if f}
+
+def signature_tables(cat=None):
+  """cols[j][i]: MinHash signature of the prompt text contributed by value i of column j."""
+  cols = []
+  for name,vals in component_lists(cat):
+    col = []
+    for val in vals:
+      sh = set()
+      for f,txt in column_fields(name, val).items():
+        if f in PROMPT_FIELDS: sh |= neardup.shingles(str(txt))
+      col.append(MINHASH.signature(sh))
+    cols.append(np.stack(col) if np is not None else col)
+  return cols
 
-def write_pack(ideas, outdir="public"):
+def row_signature(row, sig_tables):
+  return neardup.combine(col[int(i)] for col,i in zip(sig_tables, row))
+
+SIG_CHUNK = 4096
+
+def row_signatures(rows, sig_tables):
+  """Signatures of an (m, len(COLUMNS)) array of rows at once (NumPy only): (m, num_perm)."""
+  return np.minimum.reduce([col[rows[:,j]] for j,col in enumerate(sig_tables)])
+
+def select_top(heap, keep, rows, scores, seq, sig_tables, near, recent=None, seen=None, stats=None):
+  """Stream rows into a min-heap holding the `keep` best (score, -seq, row, sig) entries.
+
+  Ties go to the earlier candidate, like a stable sort. A row is skipped when
+  `seen(row)` is true or it is a near-duplicate of a row already held (`near`)
+  or of a recent pack. Returns the seq of the next row. With `stats` (a dict),
+  adds how many rows were already used / near-duplicates / of a recent pack.
+  """
+  order = range(len(rows))
+  if np is not None:
+    order = np.flatnonzero(scores > heap[0][0]) if len(heap) >= keep else np.arange(len(rows))
+  n_used = n_near = n_recent = 0
+  for k,i in enumerate(order.tolist() if np is not None else order):
+    if np is not None and k % SIG_CHUNK == 0:   # signatures a chunk at a time, vectorised
+      chunk = row_signatures(rows[order[k:k + SIG_CHUNK]], sig_tables)
+    item = (int(scores[i]), -(seq + i))
+    if len(heap) >= keep and item <= heap[0][:2]: continue
+    if seen is not None and seen(rows[i]):
+      n_used += 1; continue
+    sig = chunk[k % SIG_CHUNK].copy() if np is not None else row_signature(rows[i], sig_tables)
+    if near.query(sig):
+      n_near += 1; continue
+    if recent is not None and recent.query(sig):
+      n_recent += 1; continue
+    near.add(seq + i, sig)
+    item += (rows[i].copy() if np is not None else rows[i], sig)   # a view would pin the whole batch
+    if len(heap) < keep: heapq.heappush(heap, item)
+    else: near.remove(-heapq.heapreplace(heap, item)[1])
+  if stats is not None:
+    for k,v in (("used", n_used), ("near_dup", n_near), ("recent_dup", n_recent)):
+      stats[k] = stats.get(k, 0) + v
+  return seq + len(rows)
+
+# ---------- combination ledger ----------
+# Each idea is one integer ID in the mixed-radix space of the component lists.
+# With a ledger.Ledger, candidates come from a keyed permutation walk of that
+# space (never revisiting an ID until every combination was offered) and
+# published combinations go into a Bloom filter that survives seed changes.
+def combination_space(cat=None):
+  """(radices, fingerprint) of the current component lists."""
+  lists = component_lists(cat)
+  blob = json.dumps([[name, vals] for name,vals in lists], ensure_ascii=False)
+  return [len(vals) for _,vals in lists], hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+def value_key_tables(cat=None):
+  """keys[j][i]: 64-bit hash of value i of column j, so a combination's content key
+  stays the same when seeds.json reorders or grows the lists."""
+  h = lambda s: int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+  return [[h(name + "=" + json.dumps(val, ensure_ascii=False)) for val in vals]
+          for name,vals in component_lists(cat)]
+
+def combo_key(row, key_tables):
+  return sum(col[int(i)] for col,i in zip(key_tables, row)) & ledger.MASK64
+
+# Near-duplicates saturate: past a point almost every candidate is too close to a
+# kept idea and the pool never reaches `keep`. build_rows stops once a batch adds
+# fewer than this share of new ideas instead of grinding through the rest of n.
+MIN_YIELD = 0.001
+
+def candidate_batches(n, batch=100_000, rng=None, cat=None, used=None):
+  """n candidate rows, `batch` at a time: the ledger's permutation walk with `used`,
+  else random samples."""
+  rng = rng or make_rng()
+  radices = combination_space(cat)[0] if used is not None else None
+  for start in range(0, n, batch):
+    m = min(batch, n - start)
+    yield ledger.decode(used.next_ids(m), radices) if used is not None else sample_indices(m, rng, cat)
+
+def build_rows(n=80, keep=30, batch=100_000, rng=None, cat=None,
+               threshold=NEAR_DUP_THRESHOLD, recent=None, used=None, min_yield=MIN_YIELD):
+  """Rows of the best `keep` of `n` candidates, with no two prompts near-duplicates.
+  Candidates stream through select_top a batch at a time, so memory depends on
+  `batch` and `keep`, not `n`. While fewer than `keep` are held, it stops early
+  once a batch yields under `min_yield` new ideas per candidate (see MIN_YIELD).
+
+  `recent` is an optional neardup.RecentPacks; kept prompts are checked against
+  it and then recorded in it. `used` is an optional ledger.Ledger: candidates are
+  taken from its permutation walk instead of random sampling, combinations it has
+  already published are skipped, and kept ones are recorded. Callers save both.
+  """
+  tables = score_tables(cat)
+  sig_tables = signature_tables(cat)
+  near = neardup.LSHIndex(threshold, MINHASH.num_perm)
+  old = recent.index(threshold) if recent is not None else None
+  seen = None
+  if used is not None:
+    key_tables = value_key_tables(cat)
+    seen = lambda row: combo_key(row, key_tables) in used.bloom
+  heap = []; seq = 0; stats = {}
+  for rows in candidate_batches(n, batch, rng, cat, used):
+    held = len(heap)
+    seq = select_top(heap, keep, rows, score_rows(rows, tables), seq, sig_tables, near, old, seen, stats)
+    if seq < n and len(heap) < keep and len(heap) - held < min_yield * len(rows):
+      print(f"Stopped after {seq:,} of {n:,} candidates: near-duplicates leave {len(heap):,} of {keep:,} ideas "
+            f"(the last {len(rows):,} added {len(heap) - held:,})")
+      metrics.run.count("candidates.stopped_early")
+      break
+  kept = sorted(heap, reverse=True)
+  metrics.run.count("candidates.generated", seq)
+  for k,v in stats.items(): metrics.run.count(f"candidates.skipped_{k}", v)
+  metrics.run.count("candidates.selected", len(kept))
+  if recent is not None and kept:
+    recent.add(datetime.datetime.now().isoformat(timespec="seconds"), [item[3] for item in kept])
+  if used is not None:
+    used.record(combo_key(item[2], key_tables) for item in kept)
+  return [[int(i) for i in item[2]] for item in kept]
+
+def build_pack(n=80, keep=30, batch=100_000, rng=None, cat=None,
+               threshold=NEAR_DUP_THRESHOLD, recent=None, used=None):
+  """build_rows, rendered (see render_idea)."""
+  return [render_idea(row, cat) for row in build_rows(n, keep, batch, rng, cat, threshold, recent, used)]
+
+# ---------- compact pack ----------
+# latest.pack.json is a small manifest: the canon, templates and component values
+# once, plus a list of fixed-size shards (pack/shard-NNNN.json) that hold each idea
+# as its row of indices. index.html fills the templates in the browser and only
+# fetches the shards it is about to show or copy.
+PACK_VERSION = 2
+SHARD_SIZE = 500
+VOICE_LINE = "VOICE: executive silent-film vibe; any words appear only as brief on-screen captions/intercom text."
+WRITE_FULL_PACK = os.getenv("BAXTER_FULL_PACK", "0") == "1"   # expanded latest.json/latest.txt too
+
+try:
+  import brotli  # optional: .br siblings
+except ImportError:
+  brotli = None
+
+def pack_manifest(cat=None, ts=""):
+  cat = cat or canon()
+  columns = []
+  for name,vals in component_lists(cat):
+    fields = list(column_fields(name, vals[0]))
+    columns.append({"name": name, "fields": fields,
+                    "values": [list(column_fields(name, v).values()) for v in vals]})
+  return {
+    "v": PACK_VERSION, "generated": ts,
+    "canon": dict(cat_fields(cat), one_liner=cat["one_liner"]),
+    "templates": {"title": TITLE_TEMPLATE, "beats": BEATS, "prompt": PROMPT_TEMPLATE, "voice_line": VOICE_LINE},
+    "columns": columns,
+  }
+
+def write_compressed(path, data):
+  """Write `data` (bytes) plus precompressed .gz (and .br when brotli is installed) siblings."""
+  with open(path, "wb") as f: f.write(data)
+  with open(path + ".gz", "wb") as f: f.write(gzip.compress(data, compresslevel=9, mtime=0))
+  if brotli is not None:
+    with open(path + ".br", "wb") as f: f.write(brotli.compress(data, quality=11))
+
+def dump_compact(obj):
+  return json.dumps(obj, ensure_ascii=False, separators=(",",":")).encode("utf-8")
+
+def write_shards(rows, outdir, shard_size=SHARD_SIZE):
+  """Write pack/shard-NNNN.json files of component rows (removing stale ones); returns (paths, pack id)."""
+  sdir = os.path.join(outdir, "pack")
+  pathlib.Path(sdir).mkdir(parents=True, exist_ok=True)
+  for name in os.listdir(sdir):
+    if name.startswith("shard-"): os.remove(os.path.join(sdir, name))
+  paths, digest = [], hashlib.sha1()
+  for s,start in enumerate(range(0, len(rows), shard_size)):
+    data = dump_compact({"start": start, "ideas": rows[start:start + shard_size]})
+    digest.update(data)
+    paths.append(f"pack/shard-{s:04d}.json")
+    write_compressed(os.path.join(outdir, paths[-1]), data)
+  return paths, digest.hexdigest()[:12]
+
+# Virtualized "Copy Next" page: cards have a fixed height, so only the rows in view
+# (plus OVERSCAN) are in the DOM; the queue position is kept in localStorage per pack.
+PAGE_JS = r"""
+const ROW_H=150, OVERSCAN=6, PREFETCH=100;
+let man=null, idx=0, key='';
+const shards=new Map(), pending=new Map();
+const fill=(t,v)=>t.replace(/\{(\w+)\}/g,(_,k)=>String(v[k]));
+function expand(row){const v=Object.assign({},man.canon);
+man.columns.forEach((c,j)=>c.fields.forEach((f,k)=>v[f]=c.values[row[j]][k]));
+v.title=fill(man.templates.title,v); man.templates.beats.forEach(([n,t])=>v[n]=fill(t,v));
+return {title:v.title, prompt:fill(man.templates.prompt,v)};}
+const esc=s=>s.replace(/[&<>]/g,c=>({'&':'&amp;','<':'&lt;','>':'&gt;'}[c]));
+function loadShard(s){
+  if(s<0||s>=man.shards.length) return Promise.resolve([]);
+  if(shards.has(s)) return Promise.resolve(shards.get(s));
+  if(!pending.has(s)) pending.set(s, fetch(man.shards[s]).then(r=>{
+    if(!r.ok) throw new Error(`${man.shards[s]}: HTTP ${r.status}`); return r.json();}).then(d=>{
+    shards.set(s,d.ideas); pending.delete(s); schedule(); return d.ideas;})
+    .catch(e=>{pending.delete(s); throw e;}));  // a failed shard is fetched again on next use
+  return pending.get(s);}
+async function rowAt(i){const s=Math.floor(i/man.shard_size);
+  const rows=await loadShard(s); return rows[i-s*man.shard_size];}  // rejects if the shard can't be loaded
+const background=p=>p.catch(()=>{});  // cards stay "loading…" and the next render retries
+function cached(i){const s=Math.floor(i/man.shard_size), rows=shards.get(s);
+  if(!rows){background(loadShard(s)); return null;} return rows[i-s*man.shard_size];}
+function prefetch(i){if(i%man.shard_size>=man.shard_size-PREFETCH) background(loadShard(Math.floor(i/man.shard_size)+1));}
+function render(){
+  const list=document.getElementById('list'), top=window.scrollY-list.offsetTop;
+  const first=Math.max(0,Math.floor(top/ROW_H)-OVERSCAN);
+  const last=Math.min(man.total,Math.ceil((top+window.innerHeight)/ROW_H)+OVERSCAN);
+  let html='';
+  for(let i=first;i<last;i++){const r=cached(i), it=r?expand(r):{title:'…',prompt:'loading…'};
+    html+=`<div class="card${i===idx?' next':''}${i<idx?' done':''}" style="top:${i*ROW_H}px"><b>#${i+1} — ${esc(it.title)}</b><pre>${esc(it.prompt)}</pre></div>`;}
+  list.innerHTML=html; if(last>0) prefetch(last-1);}
+let queued=false;
+function schedule(){if(!queued){queued=true; requestAnimationFrame(()=>{queued=false; render();});}}
+function updateCounter(){document.getElementById('counter').textContent=(man.total-idx);}
+function setIdx(i){idx=Math.max(0,Math.min(man.total,i)); localStorage.setItem(key,idx); updateCounter(); prefetch(idx); schedule();}
+async function copyNext(){if(idx>=man.total)return;
+  await navigator.clipboard.writeText(expand(await rowAt(idx)).prompt); setIdx(idx+1);
+  const y=document.getElementById('list').offsetTop+idx*ROW_H;
+  if(y<window.scrollY||y+ROW_H>window.scrollY+window.innerHeight) window.scrollTo(0,y-ROW_H);}
+async function downloadTxt(){const all=(await Promise.all(man.shards.map((_,s)=>loadShard(s)))).flat();
+  const c=man.canon; let s=`CAT CANON — ${c.name}: ${c.one_liner}\n${man.templates.voice_line}\n\n`;
+  all.forEach((row,i)=>{const it=expand(row); s+=`#${i+1} — ${it.title}\n${it.prompt}\n---\n`;});
+  const a=document.createElement('a'); a.href=URL.createObjectURL(new Blob([s],{type:'text/plain'}));
+  a.download='latest.txt'; a.click();}
+async function load(){man=await (await fetch('latest.pack.json')).json(); key='baxter-pos-'+man.id;
+  document.getElementById('list').style.height=(man.total*ROW_H)+'px';
+  setIdx(+localStorage.getItem(key)||0);
+  if(idx>0) window.scrollTo(0,document.getElementById('list').offsetTop+idx*ROW_H-ROW_H);}
+document.getElementById('copyBtn').addEventListener('click',copyNext);
+document.getElementById('resetBtn').addEventListener('click',()=>{setIdx(0); window.scrollTo(0,0);});
+document.getElementById('txtBtn').addEventListener('click',downloadTxt);
+window.addEventListener('scroll',schedule,{passive:true}); window.addEventListener('resize',schedule);
+load();
+function showMetrics(m){
+  const kv=o=>Object.entries(o).map(([k,v])=>`${esc(k)}=${esc(typeof v==='object'?JSON.stringify(v):String(v))}`).join(' · ');
+  let html='';
+  for(const [name,sec] of Object.entries(m)){
+    html+=`<p><b>${esc(name)}</b> <span class="small">${esc(sec.updated)}</span><br>stages (s): ${kv(sec.stages)}<br>${kv(sec.counters)}`;
+    for(const [host,h] of Object.entries(sec.upstream)) html+=`<br>${esc(host)}: ${h.calls} calls, ${kv(h.status)}, cache ${kv(h.cache)}, ${h.bytes} B, max ${h.seconds_max}s`;
+    sec.errors.forEach(e=>html+=`<br><span style="color:#b00">${esc(e.where)}: ${esc(e.error)}</span>`);
+    html+='</p>';}
+  document.getElementById('metricsBody').innerHTML=html;}
+fetch('metrics.json').then(r=>r.ok?r.json():null).then(m=>m&&showMetrics(m)).catch(()=>{});
+"""
+
+def write_compact(rows, outdir, cat, ts):
+  """Shards and the latest.pack.json manifest for a list of component rows."""
   pathlib.Path(outdir).mkdir(parents=True, exist_ok=True)
+  shards, pack_id = write_shards(rows, outdir)
+  manifest = dict(pack_manifest(cat, ts=ts), id=pack_id, total=len(rows), shard_size=SHARD_SIZE, shards=shards)
+  write_compressed(os.path.join(outdir,"latest.pack.json"), dump_compact(manifest))
+
+def txt_header(cat):
+  return f"CAT CANON — {cat['name']}: {cat['one_liner']}\n" + VOICE_LINE + "\n\n"
+
+def txt_entry(i, it):
+  return f"#{i} — {it['title']}\n{it['prompt_for_sora']}\n---\n"
+
+def remove_stale(outdir, *names):
+  for name in names:
+    if os.path.exists(os.path.join(outdir, name)): os.remove(os.path.join(outdir, name))
+
+def write_pack(ideas, outdir="public", full=WRITE_FULL_PACK, cat=None):
+  """Write the manifest latest.pack.json, its shards (each with .gz/.br siblings)
+  and index.html; with `full`, also the expanded latest.json and latest.txt (else
+  stale copies are removed)."""
+  cat = cat or canon()
   ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
-  with open(os.path.join(outdir,"latest.json"),"w",encoding="utf-8") as f:
-    json.dump(ideas, f, ensure_ascii=False, indent=2)
-  with open(os.path.join(outdir,"latest.txt"),"w",encoding="utf-8") as f:
-    f.write(f"CAT CANON — {CAT['name']}: {CAT['one_liner']}\n")
-    f.write("VOICE: executive silent-film vibe; any words appear only as brief on-screen captions/intercom text.\n\n")
-    for i,it in enumerate(ideas,1):
-      f.write(f"#{i} — {it['title']}\n{it['prompt_for_sora']}\n---\n")
-  html=f"""<!doctype html><html><head><meta charset="utf-8"><title>{CAT['name']} Idea Pack — {ts}</title>
+  write_compact([it["components"] for it in ideas], outdir, cat, ts)
+  remove_stale(outdir, "latest.jsonl", *(() if full else ("latest.json", "latest.txt")))
+  if full:
+    with open(os.path.join(outdir,"latest.json"),"w",encoding="utf-8") as f:
+      json.dump(ideas, f, ensure_ascii=False, indent=2)
+    with open(os.path.join(outdir,"latest.txt"),"w",encoding="utf-8") as f:
+      f.write(txt_header(cat))
+      for i,it in enumerate(ideas,1): f.write(txt_entry(i, it))
+  write_index(outdir, cat, ts)
+
+def write_stream(rows, outdir="public", full=True, cat=None):
+  """Streaming write_pack for large archive packs, from build_rows' rows: each idea is
+  rendered, appended to latest.jsonl (one JSON object per line) and latest.txt, and
+  dropped, so only the compact rows are ever held. Replaces latest.json. Archives are
+  for download, so the expanded files are written unless `full` is false."""
+  cat = cat or canon()
+  ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+  write_compact(rows, outdir, cat, ts)
+  remove_stale(outdir, "latest.json", *(() if full else ("latest.jsonl", "latest.txt")))
+  if full:
+    with open(os.path.join(outdir,"latest.jsonl"),"w",encoding="utf-8") as fj, \
+         open(os.path.join(outdir,"latest.txt"),"w",encoding="utf-8") as ft:
+      ft.write(txt_header(cat))
+      for i,row in enumerate(rows,1):
+        it = render_idea(row, cat)
+        fj.write(json.dumps(it, ensure_ascii=False) + "\n")
+        ft.write(txt_entry(i, it))
+  write_index(outdir, cat, ts)
+
+def write_index(outdir, cat, ts):
+  html=f"""<!doctype html><html><head><meta charset="utf-8"><title>{cat['name']} Idea Pack — {ts}</title>
+<meta name="viewport" content="width=device-width,initial-scale=1">
 <style>body{{font-family:system-ui,Segoe UI,Roboto,Arial,sans-serif;max-width:900px;margin:24px auto;padding:0 16px}}
 .card{{border:1px solid #ddd;border-radius:12px;padding:16px;margin:12px 0}}
+#list{{position:relative}}#list .card{{position:absolute;left:0;right:0;margin:0;height:126px;overflow:hidden;box-sizing:content-box;padding:8px 16px}}
+#list .next{{border-color:#333}}#list .done{{opacity:.5}}
+#controls{{position:sticky;top:0;background:#fff;z-index:1}}
 button{{padding:8px 12px;border-radius:10px;border:1px solid #ccc;cursor:pointer}}
-#counter{{font-weight:600}}.small{{color:#444;font-size:13px}}pre{{white-space:pre-wrap}}</style></head>
-<body><h1>{CAT['name']} Idea Pack — {ts}</h1>
-<p class="small">Canon: {CAT['one_liner']}</p>
+#counter{{font-weight:600}}.small{{color:#444;font-size:13px}}pre{{white-space:pre-wrap;margin:4px 0;font-size:12px}}</style></head>
+<body><h1>{cat['name']} Idea Pack — {ts}</h1>
+<p class="small">Canon: {cat['one_liner']}</p>
 <p class="small">Voice rule: executive silent-film vibe; words appear only as brief on-screen captions/intercom text.</p>
-<p>Click <b>Copy Next</b>, then paste into Sora and hit Generate. Repeat.</p>
-<p>Remaining: <span id="counter"></span></p>
-<div id="controls" class="card"><button id="copyBtn">Copy Next</button>
-<a href="latest.txt" download style="margin-left:8px">Download .txt</a></div>
+<p>Click <b>Copy Next</b>, then paste into Sora and hit Generate. Repeat. Your place is remembered on this device.</p>
+<details class="card small"><summary>Run metrics</summary><div id="metricsBody">No metrics.json yet.</div></details>
+<div id="controls" class="card"><button id="copyBtn">Copy Next</button> Remaining: <span id="counter"></span>
+<button id="txtBtn" style="margin-left:8px">Download .txt</button> <button id="resetBtn">Start over</button></div>
 <div id="list"></div>
-<script>
-let ideas=[], idx=0;
-async function load(){{const r=await fetch('latest.json'); ideas=await r.json(); idx=0; updateCounter();
-document.getElementById('list').innerHTML = ideas.map((it,i)=>`<div class="card"><b>#${{i+1}} — ${{it.title}}</b><pre>${{it.prompt_for_sora}}</pre></div>`).join('');}}
-function updateCounter(){{document.getElementById('counter').textContent=(ideas.length-idx);}}
-async function copyNext(){{if(idx>=ideas.length)return; await navigator.clipboard.writeText(ideas[idx].prompt_for_sora); idx++; updateCounter();}}
-document.getElementById('copyBtn').addEventListener('click',copyNext); load();
-</script></body></html>"""
+<script>{PAGE_JS}</script></body></html>"""
   with open(os.path.join(outdir,"index.html"),"w",encoding="utf-8") as f: f.write(html)
 
+def build_with_history(n=80, keep=30, cat=None, cache_dir=CACHE_DIR, rng=None, history=True, stream=False):
+  """build_pack (build_rows with `stream`); with `history`, the near-duplicate index of
+  recent packs and the combination ledger in `cache_dir` are used and updated. Streamed
+  archive packs keep theirs in `cache_dir`/archive, apart from the published packs'."""
+  recent = used = None
+  if stream:
+    cache_dir = os.path.join(cache_dir, "archive")
+  if history:
+    recent = neardup.RecentPacks(os.path.join(cache_dir, "recent_packs.json"), MINHASH)
+    radices, space = combination_space(cat)
+    used = ledger.Ledger(os.path.join(cache_dir, "ledger.json"), space, ledger.space_size(radices))
+  with metrics.run.stage("build"):
+    pack = (build_rows if stream else build_pack)(n=n, keep=keep, rng=rng, cat=cat, recent=recent, used=used)
+  if history:
+    recent.save(); used.save()
+  return pack
+
+def pack_files(outdir="public"):
+  """Paths write_pack produced in `outdir`."""
+  names = ["index.html", "latest.json", "latest.jsonl", "latest.txt"]
+  names += ["latest.pack.json" + ext for ext in ("", ".gz", ".br")]
+  sdir = os.path.join(outdir, "pack")
+  names += [os.path.join("pack", f) for f in sorted(os.listdir(sdir))] if os.path.isdir(sdir) else []
+  return [p for p in (os.path.join(outdir, f) for f in names) if os.path.exists(p)]
+
+class EmptyPack(RuntimeError):
+  """No idea survived selection; nothing is written."""
+
+def write_with_metrics(pack, outdir="public", cat=None, stream=False):
+  """write_pack (write_stream with `stream`), then record output sizes and flush the
+  "generate" metrics section. Raises EmptyPack instead of writing a pack with no ideas."""
+  if not len(pack):
+    metrics.run.count("packs.empty")
+    metrics.run.flush("generate", outdir)
+    raise EmptyPack("no ideas were selected (all candidates used or near-duplicates of recent packs)")
+  with metrics.run.stage("write"):
+    (write_stream if stream else write_pack)(pack, outdir, cat=cat)
+  for name in ("latest.pack.json", "latest.json", "latest.jsonl", "latest.txt", "index.html"):
+    if os.path.exists(os.path.join(outdir, name)):
+      metrics.run.set(f"bytes.{name}", os.path.getsize(os.path.join(outdir, name)))
+  metrics.run.set("bytes.shards", sum(os.path.getsize(os.path.join(outdir, "pack", f))
+                                      for f in os.listdir(os.path.join(outdir, "pack")) if f.endswith(".json")))
+  metrics.run.flush("generate", outdir)
+
+def generate(n=80, keep=30, outdir="public", cat=None, cache_dir=CACHE_DIR, rng=None, history=True, stream=False):
+  """Build and write one pack (see build_with_history); `stream` for large archive packs."""
+  pack = build_with_history(n=n, keep=keep, cat=cat, cache_dir=cache_dir, rng=rng, history=history, stream=stream)
+  write_with_metrics(pack, outdir, cat=cat, stream=stream)
+  return pack
+
+def main(argv=None):
+  ap = argparse.ArgumentParser(description="Build and write a Baxter idea pack.")
+  ap.add_argument("--n", type=int, default=80, help="candidates to generate (e.g. 5_000_000)")
+  ap.add_argument("--keep", type=int, default=30, help="ideas to keep")
+  ap.add_argument("--out", default="public", help="output directory")
+  ap.add_argument("--stream", action="store_true",
+                  help="bounded-memory mode: write latest.jsonl/latest.txt one idea at a time")
+  ap.add_argument("--no-history", action="store_true", help="ignore and don't update the recent-pack index and ledger")
+  args = ap.parse_args(argv)
+  try:
+    generate(n=args.n, keep=args.keep, outdir=args.out, history=not args.no_history, stream=args.stream)
+  except EmptyPack as e:
+    sys.exit(f"Not writing the pack: {e}")
+
 if __name__ == "__main__":
-  pack = build_pack(n=80, keep=30)
-  write_pack(pack)
+  main()
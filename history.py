@@ -0,0 +1,145 @@
+# history.py
+# Every item ingest fetches, upserted into one SQLite file (.cache/history.sqlite)
+# with an FTS5 index on titles, so questions like "which elevator or bodega posts
+# trended this week" are a local query instead of a refetch:
+#   python history.py "elevator OR bodega" --days 7 [--platform reddit] [--limit 20]
+# Items not seen for BAXTER_HISTORY_DAYS days (default 90) are pruned on each write.
+# Query syntax is FTS5's (OR, NOT, "phrases", prefix*); without FTS5 in the local
+# SQLite build, search falls back to a substring match.
+
+import argparse, datetime as dt, os, sqlite3
+from typing import Dict, Iterable, List
+
+HISTORY_PATH = os.path.join(os.getenv("BAXTER_CACHE_DIR", ".cache"), "history.sqlite")
+RETENTION_DAYS = float(os.getenv("BAXTER_HISTORY_DAYS", "90"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    platform TEXT NOT NULL,
+    id TEXT NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    source TEXT NOT NULL DEFAULT '',     -- channel, or r/<subreddit>
+    score INTEGER NOT NULL DEFAULT 0,    -- highest seen
+    views INTEGER NOT NULL DEFAULT 0,    -- highest seen
+    published_at TEXT NOT NULL DEFAULT '',
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    PRIMARY KEY (platform, id)
+);
+CREATE INDEX IF NOT EXISTS items_last_seen ON items (last_seen);
+"""
+# External-content index over items.title, kept in sync by triggers
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+    title, content='items', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2');
+CREATE TRIGGER IF NOT EXISTS items_ai AFTER INSERT ON items BEGIN
+    INSERT INTO items_fts (rowid, title) VALUES (new.rowid, new.title);
+END;
+CREATE TRIGGER IF NOT EXISTS items_ad AFTER DELETE ON items BEGIN
+    INSERT INTO items_fts (items_fts, rowid, title) VALUES ('delete', old.rowid, old.title);
+END;
+CREATE TRIGGER IF NOT EXISTS items_au AFTER UPDATE OF title ON items WHEN old.title IS NOT new.title BEGIN
+    INSERT INTO items_fts (items_fts, rowid, title) VALUES ('delete', old.rowid, old.title);
+    INSERT INTO items_fts (rowid, title) VALUES (new.rowid, new.title);
+END;
+"""
+UPSERT = """
+INSERT INTO items (platform, id, title, source, score, views, published_at, first_seen, last_seen)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (platform, id) DO UPDATE SET
+    title = excluded.title, source = excluded.source,
+    score = max(score, excluded.score), views = max(views, excluded.views),
+    published_at = coalesce(nullif(excluded.published_at, ''), published_at),
+    last_seen = max(last_seen, excluded.last_seen)
+"""
+COLUMNS = ("platform", "id", "title", "source", "score", "views", "published_at", "first_seen", "last_seen")
+
+def iso(t: dt.datetime) -> str:
+    return t.replace(microsecond=0).isoformat("T") + "Z"
+
+def ago(days, now=None) -> str:
+    return iso((now or dt.datetime.utcnow()) - dt.timedelta(days=days))
+
+class History:
+    def __init__(self, path=HISTORY_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        try:
+            self.db.executescript(FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:     # SQLite built without FTS5
+            self.fts = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.db.close()
+
+    def upsert(self, items: Iterable[Dict], fetched_at) -> int:
+        """Insert or refresh ingest items (snapshot items or streamed records); returns how many."""
+        rows = [(it["platform"], it["id"], it.get("title", ""), it.get("channel") or it.get("source", ""),
+                 int(it.get("score") or 0), int(it.get("views") or 0), it.get("published_at", ""),
+                 fetched_at, fetched_at) for it in items]
+        with self.db:
+            self.db.executemany(UPSERT, rows)
+        return len(rows)
+
+    def prune(self, days=RETENTION_DAYS, now=None) -> int:
+        """Delete items not seen in the last `days` days; returns how many."""
+        with self.db:
+            return self.db.execute("DELETE FROM items WHERE last_seen < ?", (ago(days, now),)).rowcount
+
+    def count(self) -> int:
+        return self.db.execute("SELECT count(*) FROM items").fetchone()[0]
+
+    def search(self, query="", days=None, platform=None, limit=50) -> List[Dict]:
+        """Items whose titles match `query` (all items if empty), seen in the last `days`
+        days; best text match first, then highest score and views."""
+        where, args = [], []
+        if days is not None:
+            where.append("i.last_seen >= ?")
+            args.append(ago(days))
+        if platform:
+            where.append("i.platform = ?")
+            args.append(platform)
+        cols = ", ".join("i." + c for c in COLUMNS)
+        if query and self.fts:
+            sql = (f"SELECT {cols} FROM items_fts JOIN items i ON i.rowid = items_fts.rowid "
+                   f"WHERE items_fts MATCH ?{''.join(' AND ' + w for w in where)} "
+                   f"ORDER BY bm25(items_fts), i.score + i.views DESC LIMIT ?")
+            try:
+                rows = self.db.execute(sql, [query] + args + [limit]).fetchall()
+            except sqlite3.OperationalError:
+                # Not valid FTS5 syntax (e.g. a stray quote): match the words literally
+                words = " ".join('"' + w.replace('"', '""') + '"' for w in query.split())
+                rows = self.db.execute(sql, [words] + args + [limit]).fetchall()
+        else:
+            if query:
+                where.append("i.title LIKE ?")
+                args.append(f"%{query}%")
+            sql = (f"SELECT {cols} FROM items i{' WHERE ' + ' AND '.join(where) if where else ''} "
+                   f"ORDER BY i.score + i.views DESC LIMIT ?")
+            rows = self.db.execute(sql, args + [limit]).fetchall()
+        return [dict(zip(COLUMNS, r)) for r in rows]
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Search the history of fetched trending items.")
+    ap.add_argument("query", nargs="?", default="", help="FTS5 query on titles, e.g. 'elevator OR bodega'")
+    ap.add_argument("--days", type=float, default=7, help="only items seen in the last N days")
+    ap.add_argument("--platform", choices=["youtube", "reddit"])
+    ap.add_argument("--limit", type=int, default=20)
+    args = ap.parse_args(argv)
+    with History() as h:
+        for it in h.search(args.query, args.days, args.platform, args.limit):
+            print(f"{it['last_seen'][:10]}  {it['platform']:<7} {it['source'][:20]:<20} "
+                  f"{max(it['score'], it['views']):>10,}  {it['title']}")
+
+if __name__ == "__main__":
+    main()
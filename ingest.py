@@ -0,0 +1,308 @@
+# ingest.py
+# Fetches every upstream source once and writes one normalized snapshot
+# (default .cache/snapshot.json) that fetch_top10_trending.py and
+# trends_to_seeds.py both read, so neither hits the APIs on its own.
+# Needs: YOUTUBE_API_KEY for the YouTube feeds. Reddit goes through OAuth when
+# REDDIT_CLIENT_ID / REDDIT_CLIENT_SECRET are set, else the public JSON listings.
+# Reddit listings are paged deeper than the snapshot keeps (BAXTER_REDDIT_DEPTH); every
+# post scanned is streamed to .cache/reddit_stream.jsonl for seed mining instead.
+# Every fetched item is also upserted into the history store (history.py).
+#
+# Snapshot item fields: platform, feeds, id, title, description, source,
+# channel/subreddit, score, views, domain, url, thumb, published_at, fetched_at.
+
+import os, json, hashlib, heapq, itertools, threading, datetime as dt
+from typing import Callable, Dict, Iterable, Iterator, List
+
+import history, metrics, upstream
+
+YOUTUBE_KEY = os.getenv("YOUTUBE_API_KEY")
+
+SNAPSHOT_PATH = os.path.join(os.getenv("BAXTER_CACHE_DIR", ".cache"), "snapshot.json")
+SNAPSHOT_MAX_AGE_S = float(os.getenv("BAXTER_SNAPSHOT_MAX_AGE", "3600"))
+OFFLINE = bool(os.getenv("BAXTER_OFFLINE"))
+
+YT_QUERIES = ["funny OR comedy"]
+REDDIT_SUBS = ["funny", "funnyvideos", "ContagiousLaughter", "MadeMeSmile"]
+REDDIT_LIMIT = 30                # posts kept per subreddit (snapshot, trending page)
+# Posts scanned per subreddit (following the `after` cursor) and streamed into seed mining
+REDDIT_DEPTH = int(os.getenv("BAXTER_REDDIT_DEPTH", "100"))
+REDDIT_PAGE = 100                # listing page size (Reddit's maximum)
+REDDIT_PAGE_MARGIN_S = 20        # don't start another page with less run budget than this
+
+# Every streamed post, one compact JSON record per line, for trends_to_seeds.py
+STREAM_PATH = os.path.join(os.getenv("BAXTER_CACHE_DIR", ".cache"), "reddit_stream.jsonl")
+STREAM_FIELDS = ("platform", "id", "title", "description", "source", "score", "views", "published_at")
+STREAM_BATCH = 1000
+
+def now_iso():
+    return dt.datetime.utcnow().replace(microsecond=0).isoformat("T") + "Z"
+
+def iso_24h_ago():
+    # Whole hours, so repeated runs within the hour send the same (cacheable) query
+    t = dt.datetime.utcnow() - dt.timedelta(days=1)
+    return t.replace(minute=0, second=0, microsecond=0).isoformat("T") + "Z"
+
+def _yt_item(v, feed, fetched_at) -> Dict:
+    sn = v.get("snippet", {})
+    return {
+        "platform": "youtube",
+        "feeds": [feed],
+        "id": v["id"],
+        "title": sn.get("title", ""),
+        "description": sn.get("description", ""),
+        "source": "youtube",
+        "channel": sn.get("channelTitle", ""),
+        "score": int(v.get("statistics", {}).get("likeCount", 0)),
+        "views": int(v.get("statistics", {}).get("viewCount", 0)),
+        "domain": "youtube.com",
+        "url": f"https://www.youtube.com/watch?v={v['id']}",
+        "thumb": f"https://img.youtube.com/vi/{v['id']}/hqdefault.jpg",
+        "published_at": sn.get("publishedAt", ""),
+        "fetched_at": fetched_at,
+    }
+
+def yt_search_funny(budget: upstream.Budget = None) -> List[Dict]:
+    """Most-viewed short funny videos of the last 24h (search.list + videos.list)."""
+    if not YOUTUBE_KEY:
+        return []
+    base_search = upstream.YOUTUBE_API_BASE + "/search"
+    base_videos = upstream.YOUTUBE_API_BASE + "/videos"
+    params = {
+        "part": "snippet",
+        "type": "video",
+        "order": "viewCount",
+        "maxResults": 50,
+        "videoDuration": "short",    # < 4 minutes; we’ll still pick the funniest/most-viewed
+        "publishedAfter": iso_24h_ago(),
+        "regionCode": "US",
+        "relevanceLanguage": "en",
+        "key": YOUTUBE_KEY
+    }
+    def search(q):
+        r = upstream.get(base_search, params=dict(params, q=q), timeout=20, budget=budget,
+                         ttl=upstream.TTL_YT_SEARCH)
+        r.raise_for_status()
+        return r.json().get("items", [])
+    # One search per query, all in flight at once; ids keep query order, first hit wins
+    found = upstream.gather({q: (lambda q=q: search(q)) for q in YT_QUERIES}, budget)
+    ids = list(dict.fromkeys(it["id"]["videoId"] for q in YT_QUERIES for it in found.get(q, [])
+                             if "id" in it and "videoId" in it["id"]))
+    if not ids:
+        return []
+    # Get stats for view counts (videos.list takes up to 50 ids per call)
+    def stats(chunk):
+        r = upstream.get(base_videos, params={
+            "part": "snippet,contentDetails,statistics",
+            "id": ",".join(chunk),
+            "key": YOUTUBE_KEY
+        }, timeout=20, budget=budget, ttl=upstream.TTL_YT_VIDEOS)
+        r.raise_for_status()
+        return r.json().get("items", [])
+    chunks = [ids[i:i + 50] for i in range(0, len(ids), 50)]
+    got = upstream.gather({i: (lambda c=c: stats(c)) for i, c in enumerate(chunks)}, budget)
+    fetched_at = now_iso()
+    return [_yt_item(v, "yt_search", fetched_at) for i in range(len(chunks)) for v in got.get(i, [])]
+
+def yt_most_popular(region="US", budget: upstream.Budget = None) -> List[Dict]:
+    """YouTube's mostPopular chart, in chart order."""
+    if not YOUTUBE_KEY:
+        return []
+    r = upstream.get(upstream.YOUTUBE_API_BASE + "/videos",
+                     params={"part": "snippet,statistics", "chart": "mostPopular", "regionCode": region,
+                             "maxResults": 50, "key": YOUTUBE_KEY},
+                     timeout=20, budget=budget, ttl=upstream.TTL_YT_VIDEOS)
+    r.raise_for_status()
+    fetched_at = now_iso()
+    return [_yt_item(v, "yt_popular", fetched_at) for v in r.json().get("items", [])]
+
+def _reddit_item(p, sub, fetched_at) -> Dict:
+    created = p.get("created_utc")
+    return {
+        "platform": "reddit",
+        "feeds": ["reddit_top"],
+        "id": p.get("id", ""),
+        "title": p.get("title", ""),
+        "description": (p.get("selftext") or "")[:500],
+        "source": f"r/{sub}",
+        "subreddit": sub,
+        "score": int(p.get("score", 0) or 0),
+        "views": int(p.get("view_count") or 0),
+        "domain": p.get("domain", ""),
+        "url": "https://redd.it/" + p.get("id", ""),
+        "thumb": "",
+        "published_at": (dt.datetime.utcfromtimestamp(created).isoformat("T") + "Z") if created else "",
+        "fetched_at": fetched_at,
+    }
+
+def reddit_listing(sub, depth=REDDIT_DEPTH, budget: upstream.Budget = None) -> Iterator[Dict]:
+    """Day-top posts of one subreddit, in listing order, following the `after` cursor
+    page by page (only one page in memory) until `depth` posts or the end of the listing.
+    A failed first page raises; a later one just ends the stream early."""
+    after, n = None, 0
+    while n < depth:
+        params = {"t": "day", "limit": min(REDDIT_PAGE, depth - n)}
+        if after:
+            params["after"] = after
+            if budget is not None and budget.remaining() < REDDIT_PAGE_MARGIN_S:
+                break     # leave room to finish before gather's deadline
+        try:
+            r = upstream.reddit_get(f"/r/{sub}/top", params=params, timeout=15, budget=budget)
+            r.raise_for_status()
+            data = r.json().get("data", {})
+        except Exception as e:
+            if after is None:
+                raise
+            metrics.run.error(f"reddit_top:{sub}", e)
+            break
+        fetched_at = now_iso()
+        children = data.get("children", [])
+        for c in children:
+            yield _reddit_item(c.get("data", {}), sub, fetched_at)
+        n += len(children)
+        after = data.get("after")
+        if not after or not children:
+            break
+
+def top_k(items: Iterable[Dict], k, key) -> List[Dict]:
+    """The k largest items by key (ties keep input order), holding at most k at a time."""
+    heap = []
+    for i, it in enumerate(items):
+        entry = (key(it), -i, it)
+        if len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif entry[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, entry)
+    return [it for _, _, it in sorted(heap, key=lambda e: e[:2], reverse=True)]
+
+def reddit_top(subs=REDDIT_SUBS, limit=REDDIT_LIMIT, depth=None, budget: upstream.Budget = None,
+               sink: Callable[[Dict], None] = None) -> List[Dict]:
+    """Top `limit` posts by score per subreddit, scanning up to `depth` posts of each
+    listing. Every scanned post is passed to `sink` as it streams in; without a sink
+    paging stops once `limit` posts are in (the listing is already score-ordered)."""
+    depth = max(limit, REDDIT_DEPTH if depth is None else depth) if sink else limit
+    def one(s):
+        posts = reddit_listing(s, depth, budget)
+        if sink:
+            posts = (sink(p) or p for p in posts)
+        return top_k(posts, limit, key=lambda p: p["score"])
+    # All subreddits in flight at once; a failed or late one is just missing
+    got = upstream.gather({s: (lambda s=s: one(s)) for s in subs}, budget)
+    return [p for s in subs for p in got.get(s, [])]
+
+class ItemStream:
+    """Sink that appends compact records of streamed items to a JSONL file (written
+    to a temp file, moved into place on close) and keeps a running count and digest."""
+
+    def __init__(self, path=STREAM_PATH):
+        self.path, self.tmp = path, path + ".tmp"
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.f = open(self.tmp, "w", encoding="utf-8")
+        self.lock = threading.Lock()
+        self.sha, self.count = hashlib.sha1(), 0
+
+    def __call__(self, it: Dict):
+        line = json.dumps({k: it[k] for k in STREAM_FIELDS}, ensure_ascii=False, sort_keys=True) + "\n"
+        with self.lock:
+            self.f.write(line)
+            self.sha.update(line.encode("utf-8"))
+            self.count += 1
+
+    def close(self) -> Dict:
+        self.f.close()
+        os.replace(self.tmp, self.path)
+        return {"path": self.path, "items": self.count, "digest": self.sha.hexdigest()}
+
+def read_stream(snap: Dict, batch=STREAM_BATCH) -> Iterator[List[Dict]]:
+    """The snapshot's streamed items, `batch` records at a time."""
+    info = snap.get("stream")
+    if not info or not os.path.exists(info["path"]):
+        return
+    with open(info["path"], "r", encoding="utf-8") as f:
+        while True:
+            rows = [json.loads(line) for line in itertools.islice(f, batch)]
+            if not rows:
+                return
+            yield rows
+
+def merge(items: List[Dict]) -> List[Dict]:
+    """One item per (platform, id); an item found by several feeds lists them all."""
+    out, seen = [], {}
+    for it in items:
+        k = (it["platform"], it["id"])
+        if k in seen:
+            feeds = seen[k]["feeds"]
+            feeds += [f for f in it["feeds"] if f not in feeds]
+            continue
+        seen[k] = it
+        out.append(it)
+    return out
+
+def fetch_snapshot(stream_path=STREAM_PATH) -> Dict:
+    budget = upstream.Budget()
+    stream = ItemStream(stream_path)
+    try:
+        with metrics.run.stage("ingest"):
+            got = upstream.gather({
+                "yt_search": lambda: yt_search_funny(budget),
+                "yt_popular": lambda: yt_most_popular(budget=budget),
+                "reddit_top": lambda: reddit_top(budget=budget, sink=stream),
+            }, budget)
+            items = merge(got.get("yt_search", []) + got.get("yt_popular", []) + got.get("reddit_top", []))
+    finally:
+        info = stream.close()
+    for feed, got_items in got.items():
+        metrics.run.set(f"ingest.items.{feed}", len(got_items))
+    metrics.run.set("ingest.items", len(items))
+    metrics.run.set("ingest.items.streamed", info["items"])
+    return {"fetched_at": now_iso(), "feeds": sorted(got), "items": items, "stream": info}
+
+def write_snapshot(snap: Dict, path=SNAPSHOT_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(snap, f, ensure_ascii=False)
+
+def record_history(snap: Dict):
+    """Upsert the snapshot's items and streamed posts into the history store, then prune it."""
+    with metrics.run.stage("history"), history.History() as h:
+        n = h.upsert(snap["items"], snap["fetched_at"])
+        for rows in read_stream(snap):
+            n += h.upsert(rows, snap["fetched_at"])
+        pruned = h.prune()
+        metrics.run.set("history.upserted", n)
+        metrics.run.set("history.pruned", pruned)
+        metrics.run.set("history.rows", h.count())
+
+def load_snapshot(path=SNAPSHOT_PATH):
+    if os.path.exists(path):
+        try:
+            return json.load(open(path, "r", encoding="utf-8"))
+        except Exception:
+            return None
+    return None
+
+def snapshot(path=SNAPSHOT_PATH, max_age=SNAPSHOT_MAX_AGE_S, offline=OFFLINE) -> Dict:
+    """The current snapshot: reuse the file if it is recent enough (or we are offline),
+    otherwise fetch and rewrite it."""
+    snap = load_snapshot(path)
+    if snap is not None:
+        age = dt.datetime.utcnow() - dt.datetime.fromisoformat(snap["fetched_at"].rstrip("Z"))
+        if offline or age.total_seconds() < max_age:
+            metrics.run.set("snapshot.reused_age_s", round(age.total_seconds()))
+            return snap
+    if offline:
+        return {"fetched_at": now_iso(), "feeds": [], "items": []}
+    snap = fetch_snapshot()
+    write_snapshot(snap, path)
+    record_history(snap)
+    return snap
+
+def main():
+    snap = fetch_snapshot()
+    write_snapshot(snap)
+    record_history(snap)
+    metrics.run.flush("ingest")
+    print(f"Wrote {SNAPSHOT_PATH} with {len(snap['items'])} items from {', '.join(snap['feeds']) or 'no feeds'}")
+
+if __name__ == "__main__":
+    main()
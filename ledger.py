@@ -0,0 +1,172 @@
+# ledger.py
+# Cross-run record of which idea combinations were already used.
+# - encode/decode: one integer ID per combination (mixed radix over the component lists)
+# - FeistelPermutation: a keyed pseudo-random permutation of [0, N), so walking
+#   cursor = 0, 1, 2, ... visits every combination once, in shuffled order
+# - BloomFilter: compact set of published combinations (no false negatives)
+# - Ledger: cursor + key + bloom, persisted in the cache directory
+
+import json, os, random
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MASK64 = (1 << 64) - 1
+BLOOM_BITS = 1 << 23      # 1 MiB; ~870k combinations at 1% false positives
+BLOOM_HASHES = 7
+
+def encode(row, radices):
+    cid = 0
+    for i, r in zip(row, radices):
+        cid = cid * r + int(i)
+    return cid
+
+def decode(ids, radices):
+    """Rows of component indices for combination IDs (an int array with NumPy, else tuples)."""
+    if np is not None:
+        ids = np.asarray(ids, dtype=np.int64).copy()
+        out = np.empty((len(ids), len(radices)), dtype=np.int64)
+        for j in range(len(radices) - 1, -1, -1):
+            out[:, j] = ids % radices[j]
+            ids //= radices[j]
+        return out
+    rows = []
+    for cid in ids:
+        row = []
+        for r in reversed(radices):
+            cid, i = divmod(cid, r)
+            row.append(i)
+        rows.append(tuple(reversed(row)))
+    return rows
+
+def space_size(radices):
+    n = 1
+    for r in radices:
+        n *= r
+    return n
+
+def _mix(x, k):
+    # splitmix64 finalizer over (x + k); only the low bits are used by the caller
+    x = (x + k) & MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK64
+    return x ^ (x >> 31)
+
+class FeistelPermutation:
+    """Bijection on [0, size): balanced Feistel network on the next even bit width,
+    with cycle walking for values that land outside the range (< 4 steps expected)."""
+
+    ROUNDS = 4
+
+    def __init__(self, size, key):
+        self.size = size
+        bits = max(2, (size - 1).bit_length())
+        self.half = (bits + 1) // 2
+        self.mask = (1 << self.half) - 1
+        rnd = random.Random(key)
+        self.keys = [rnd.getrandbits(64) for _ in range(self.ROUNDS)]
+
+    def _once(self, x):
+        left, right = x >> self.half, x & self.mask
+        for k in self.keys:
+            left, right = right, left ^ (_mix(right, k) & self.mask)
+        return (left << self.half) | right
+
+    def __call__(self, x):
+        x = self._once(x)
+        while x >= self.size:
+            x = self._once(x)
+        return x
+
+    def batch(self, start, n):
+        if np is None:
+            return [self(x) for x in range(start, start + n)]
+        x = np.arange(start, start + n, dtype=np.uint64)
+        out = self._once_np(x)
+        todo = out >= self.size
+        while todo.any():
+            out[todo] = self._once_np(out[todo])
+            todo = out >= self.size
+        return out.astype(np.int64)
+
+    def _once_np(self, x):
+        half, mask = np.uint64(self.half), np.uint64(self.mask)
+        left, right = x >> half, x & mask
+        with np.errstate(over="ignore"):
+            for k in self.keys:
+                y = right + np.uint64(k)
+                y = (y ^ (y >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+                y = (y ^ (y >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+                y = y ^ (y >> np.uint64(31))
+                left, right = right, left ^ (y & mask)
+        return (left << half) | right
+
+class BloomFilter:
+    def __init__(self, bits=BLOOM_BITS, hashes=BLOOM_HASHES, data=None):
+        self.bits, self.hashes = bits, hashes
+        self.data = bytearray(data) if data is not None else bytearray(bits // 8)
+
+    def _positions(self, key):
+        h1, h2 = key & 0xFFFFFFFF, (key >> 32) | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def add(self, key):
+        for p in self._positions(key):
+            self.data[p >> 3] |= 1 << (p & 7)
+
+    def __contains__(self, key):
+        return all(self.data[p >> 3] >> (p & 7) & 1 for p in self._positions(key))
+
+class Ledger:
+    """Permutation cursor over the current combination space plus a Bloom filter of
+    published combinations. The cursor restarts when the space changes (different
+    component lists) or is exhausted; the Bloom filter is kept, since it is keyed on
+    combination content rather than on IDs."""
+
+    def __init__(self, path, space, size):
+        self.path, self.space, self.size = path, space, size
+        self.bloom_path = os.path.splitext(path)[0] + ".bloom"
+        meta = {}
+        if os.path.exists(self.path):
+            try:
+                meta = json.load(open(self.path, "r", encoding="utf-8"))
+            except Exception:
+                meta = {}
+        self.used = meta.get("used", 0)
+        self.bloom = BloomFilter()
+        if meta.get("bloom_bits") == self.bloom.bits and os.path.exists(self.bloom_path):
+            with open(self.bloom_path, "rb") as f:
+                self.bloom = BloomFilter(data=f.read())
+        if meta.get("space") == space and meta.get("size") == size and meta.get("cursor", 0) < size:
+            self.key, self.cursor, self.epoch = meta["key"], meta["cursor"], meta.get("epoch", 0)
+        else:
+            self._new_epoch(meta.get("epoch", -1) + 1)
+        self.perm = FeistelPermutation(size, self.key)
+
+    def _new_epoch(self, epoch):
+        self.key, self.cursor, self.epoch = random.getrandbits(64), 0, epoch
+        self.perm = FeistelPermutation(self.size, self.key)
+
+    def next_ids(self, n):
+        """Next n combination IDs along the permutation (fewer if this epoch runs out first)."""
+        if self.cursor >= self.size:
+            self._new_epoch(self.epoch + 1)
+        n = min(n, self.size - self.cursor)
+        ids = self.perm.batch(self.cursor, n)
+        self.cursor += n
+        return ids
+
+    def record(self, keys):
+        for k in keys:
+            self.bloom.add(k)
+            self.used += 1
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.bloom_path, "wb") as f:
+            f.write(self.bloom.data)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"space": self.space, "size": self.size, "key": self.key, "cursor": self.cursor,
+                       "epoch": self.epoch, "used": self.used, "bloom_bits": self.bloom.bits}, f)
@@ -0,0 +1,80 @@
+# metrics.py
+# Lightweight per-run instrumentation: stage wall times, counters, upstream call
+# stats (per host: calls, status codes, cache hits, latency, bytes) and errors.
+# Every script of a run records into the module-level `run` and merges its own
+# section into metrics.json next to the pack, so one file covers the whole run.
+
+import datetime, json, os, threading, time
+from contextlib import contextmanager
+
+METRICS_FILE = "metrics.json"
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.stages = {}     # name -> seconds
+        self.counters = {}   # name -> number
+        self.upstream = {}   # host -> stats
+        self.errors = []     # {"where", "error"}
+
+    @contextmanager
+    def stage(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.stages[name] = round(self.stages.get(name, 0.0) + time.perf_counter() - t0, 4)
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def set(self, name, value):
+        with self.lock:
+            self.counters[name] = value
+
+    def http(self, host, status, seconds, nbytes=0, cache="miss"):
+        """One upstream call; `status` is the HTTP code or an exception name, `cache` is
+        miss / fresh (served from disk) / revalidated (304)."""
+        with self.lock:
+            h = self.upstream.setdefault(host, {"calls": 0, "status": {}, "cache": {}, "bytes": 0,
+                                                "seconds_total": 0.0, "seconds_max": 0.0})
+            h["calls"] += 1
+            h["status"][str(status)] = h["status"].get(str(status), 0) + 1
+            h["cache"][cache] = h["cache"].get(cache, 0) + 1
+            h["bytes"] += nbytes
+            h["seconds_total"] = round(h["seconds_total"] + seconds, 4)
+            h["seconds_max"] = round(max(h["seconds_max"], seconds), 4)
+
+    def error(self, where, exc):
+        with self.lock:
+            self.errors.append({"where": str(where), "error": f"{type(exc).__name__}: {exc}"[:300]})
+
+    def section(self):
+        with self.lock:
+            return {"updated": datetime.datetime.now().isoformat(timespec="seconds"),
+                    "stages": dict(self.stages), "counters": dict(self.counters),
+                    "upstream": json.loads(json.dumps(self.upstream)), "errors": list(self.errors)}
+
+    def flush(self, name, outdir="public"):
+        """Replace section `name` of outdir/metrics.json, keeping the other scripts' sections,
+        and start over, so a section covers what happened since the previous flush."""
+        path = os.path.join(outdir, METRICS_FILE)
+        data = {}
+        if os.path.exists(path):
+            try:
+                data = json.load(open(path, "r", encoding="utf-8"))
+            except Exception:
+                data = {}
+        data[name] = self.section()
+        self.reset()
+        os.makedirs(outdir, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        return path
+
+run = Metrics()
@@ -0,0 +1,163 @@
+# neardup.py
+# MinHash signatures + LSH banding for near-duplicate prompt detection.
+# A signature is one min-hash per permutation; the signature of a union of
+# shingle sets is the elementwise min of their signatures, so callers can
+# precompute signatures for reusable text fragments and combine them cheaply.
+
+import hashlib, json, os, random, re
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+PRIME = (1 << 61) - 1
+NUM_PERM = 64
+SHINGLE_K = 3
+
+def shingles(text, k=SHINGLE_K):
+    """Word k-grams of `text`; texts shorter than k words become one shingle."""
+    words = re.findall(r"\w+", (text or "").lower())
+    if len(words) <= k:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+def _hash64(s):
+    return int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") % PRIME
+
+class MinHasher:
+    """Deterministic (seeded) universal hashes, so signatures survive across runs."""
+
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        rnd = random.Random(seed)
+        self.num_perm, self.seed = num_perm, seed
+        self.perms = [(rnd.randrange(1, PRIME), rnd.randrange(0, PRIME)) for _ in range(num_perm)]
+
+    def empty(self):
+        return self._wrap([PRIME] * self.num_perm)
+
+    def signature(self, shingle_set):
+        hs = [_hash64(s) for s in shingle_set]
+        if not hs:
+            return self.empty()
+        return self._wrap([min((a * h + b) % PRIME for h in hs) for a, b in self.perms])
+
+    def _wrap(self, vals):
+        return np.asarray(vals, dtype=np.uint64) if np is not None else tuple(vals)
+
+def combine(sigs):
+    """Signature of the union of the underlying shingle sets."""
+    sigs = list(sigs)
+    if np is not None:
+        return np.minimum.reduce(sigs)
+    return tuple(map(min, zip(*sigs)))
+
+def similarity(s1, s2):
+    """Estimated Jaccard similarity: share of equal min-hashes."""
+    if np is not None:
+        return float(np.count_nonzero(np.asarray(s1) == np.asarray(s2))) / len(s1)
+    return sum(a == b for a, b in zip(s1, s2)) / len(s1)
+
+def lsh_params(threshold, num_perm):
+    """(bands, rows) whose S-curve midpoint (1/b)^(1/r) sits closest to `threshold`."""
+    best = None
+    for r in range(1, num_perm + 1):
+        b = num_perm // r
+        err = abs((1.0 / b) ** (1.0 / r) - threshold)
+        if best is None or err < best[0]:
+            best = (err, b, r)
+    return best[1], best[2]
+
+class LSHIndex:
+    """Banded LSH over MinHash signatures: query cost depends on bucket sizes, not index size.
+    With NumPy, signatures live in one matrix (a row per key, rows of removed keys reused)
+    and buckets hold row numbers, so a query scores all its candidates in one comparison."""
+
+    def __init__(self, threshold=0.8, num_perm=NUM_PERM):
+        self.threshold = threshold
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+        self.buckets = [{} for _ in range(self.bands)]
+        self.sigs = {}                   # key -> signature (NumPy: key -> matrix row)
+        if np is not None:
+            self.matrix = np.empty((64, num_perm), dtype=np.uint64)
+            self.keys, self.free = [], []  # row -> key; rows of removed keys
+            self.min_equal = int(np.ceil(threshold * num_perm - 1e-9))
+
+    def __len__(self):
+        return len(self.sigs)
+
+    def _bands(self, sig):
+        r = self.rows
+        if np is not None:
+            blob, w = np.ascontiguousarray(sig, dtype=np.uint64).tobytes(), r * 8
+            return [blob[i * w:(i + 1) * w] for i in range(self.bands)]
+        return [sig[i * r:(i + 1) * r] for i in range(self.bands)]
+
+    def add(self, key, sig):
+        ref = key
+        if np is not None:
+            ref = self.free.pop() if self.free else len(self.sigs)
+            if ref == len(self.matrix):
+                self.matrix = np.concatenate([self.matrix, np.empty_like(self.matrix)])
+            if ref == len(self.keys):
+                self.keys.append(key)
+            self.matrix[ref], self.keys[ref] = sig, key
+        self.sigs[key] = ref if np is not None else sig
+        for bucket, band in zip(self.buckets, self._bands(sig)):
+            bucket.setdefault(band, set()).add(ref)
+
+    def remove(self, key):
+        ref = self.sigs.pop(key)
+        if np is not None:
+            sig = self.matrix[ref]
+            self.free.append(ref)
+        else:
+            sig, ref = ref, key
+        for bucket, band in zip(self.buckets, self._bands(sig)):
+            refs = bucket[band]
+            refs.discard(ref)
+            if not refs:
+                del bucket[band]
+
+    def query(self, sig):
+        """Keys whose estimated similarity to `sig` is at least the threshold."""
+        cands = set().union(*(bucket.get(band, ()) for bucket, band in zip(self.buckets, self._bands(sig))))
+        if not cands:
+            return []
+        if np is not None:
+            rows = np.fromiter(cands, dtype=np.int64, count=len(cands))
+            equal = np.count_nonzero(self.matrix[rows] == sig, axis=1)
+            return [self.keys[r] for r in rows[equal >= self.min_equal]]
+        return [k for k in cands if similarity(sig, self.sigs[k]) >= self.threshold]
+
+class RecentPacks:
+    """Signatures of the last `max_packs` published packs, persisted as JSON. Each pack
+    keeps at most `max_sigs` (its first, i.e. best, ideas), so one oversized pack
+    cannot crowd every new prompt out of the window."""
+
+    def __init__(self, path, hasher, max_packs=14, max_sigs=100):
+        self.path, self.hasher, self.max_packs, self.max_sigs = path, hasher, max_packs, max_sigs
+        self.packs = []
+        if os.path.exists(path):
+            try:
+                data = json.load(open(path, "r", encoding="utf-8"))
+                if data.get("num_perm") == hasher.num_perm and data.get("seed") == hasher.seed:
+                    self.packs = [dict(p, sigs=p["sigs"][:max_sigs]) for p in data.get("packs", [])]
+            except Exception:
+                pass
+
+    def index(self, threshold):
+        idx = LSHIndex(threshold, self.hasher.num_perm)
+        for p in self.packs:
+            for i, sig in enumerate(p["sigs"]):
+                idx.add((p["id"], i), self.hasher._wrap(sig))
+        return idx
+
+    def add(self, pack_id, sigs):
+        self.packs.append({"id": pack_id, "sigs": [[int(x) for x in s] for s in list(sigs)[:self.max_sigs]]})
+        self.packs = self.packs[-self.max_packs:]
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"num_perm": self.hasher.num_perm, "seed": self.hasher.seed, "packs": self.packs}, f)
@@ -1,5 +1,7 @@
 
-import os, sys, requests, praw
+import os, sys
+
+import upstream
 
 ok = True
 
@@ -17,12 +19,11 @@ has("YOUTUBE_API_KEY")
 
 if os.getenv("REDDIT_CLIENT_ID") and os.getenv("REDDIT_CLIENT_SECRET") and os.getenv("REDDIT_USER_AGENT"):
     try:
-        reddit = praw.Reddit(
-            client_id=os.getenv("REDDIT_CLIENT_ID"),
-            client_secret=os.getenv("REDDIT_CLIENT_SECRET"),
-            user_agent=os.getenv("REDDIT_USER_AGENT"),
-        )
-        it = next(iter(reddit.subreddit("funny").top(time_filter="day", limit=1)), None)
+        # App-only OAuth token, then one listing through oauth.reddit.com with it
+        upstream.reddit_token.get()
+        r = upstream.reddit_get("/r/funny/top", params={"t": "day", "limit": 1}, timeout=10, ttl=0)
+        r.raise_for_status()
+        it = next(iter(r.json().get("data", {}).get("children", [])), None)
         print("Reddit API test:", "OK" if it else "No items (still OK)")
     except Exception as e:
         ok = False
@@ -30,9 +31,11 @@ if os.getenv("REDDIT_CLIENT_ID") and os.getenv("REDDIT_CLIENT_SECRET") and os.ge
 
 if os.getenv("YOUTUBE_API_KEY"):
     try:
-        url = ("https://www.googleapis.com/youtube/v3/videos"
-               "?part=snippet&chart=mostPopular&regionCode=US&maxResults=1&key=" + os.getenv("YOUTUBE_API_KEY"))
-        r = requests.get(url, timeout=10)
+        # ttl=0: always asks the server (so the key is really checked), but a 304 skips the body
+        r = upstream.get(upstream.YOUTUBE_API_BASE + "/videos",
+                         params={"part": "snippet", "chart": "mostPopular", "regionCode": "US",
+                                 "maxResults": 1, "key": os.getenv("YOUTUBE_API_KEY")},
+                         timeout=10, ttl=0)
         print("YouTube API test:", "OK" if r.ok else f"HTTP {r.status_code}")
         if not r.ok:
             ok = False
@@ -0,0 +1,66 @@
+# stage_cache.py
+# Content-addressed cache for the pipeline stages in baxter.py. A stage's key is
+# a hash of its inputs and of the source files that implement it; when the key
+# matches the last run, the stored output is reused instead of recomputed. File
+# outputs are recorded with their hashes so a stage can tell whether what is on
+# disk is still what it wrote.
+
+import hashlib, json, os
+
+STAGE_CACHE_DIR = os.path.join(os.getenv("BAXTER_CACHE_DIR", ".cache"), "stages")
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def digest(*parts) -> str:
+    """Stable hash of JSON-serializable parts."""
+    blob = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+def file_hash(path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def code_version(*names) -> str:
+    """Hash of the given repo files (sources and config such as trend_vocab.json); missing files hash as absent."""
+    out = []
+    for name in names:
+        path = os.path.join(HERE, name)
+        out.append([name, file_hash(path) if os.path.exists(path) else None])
+    return digest(out)
+
+class StageCache:
+    """One JSON record per stage: {"key", "output", "files": {path: sha256}}."""
+
+    def __init__(self, root=STAGE_CACHE_DIR):
+        self.root = root
+
+    def _path(self, stage):
+        return os.path.join(self.root, stage + ".json")
+
+    def load(self, stage):
+        try:
+            with open(self._path(stage), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def get(self, stage, key):
+        """The stored record if it was made with `key` and its files are unchanged on disk."""
+        rec = self.load(stage)
+        if not rec or rec.get("key") != key:
+            return None
+        for path, h in rec.get("files", {}).items():
+            if not os.path.exists(path) or file_hash(path) != h:
+                return None
+        return rec
+
+    def put(self, stage, key, output=None, files=()):
+        os.makedirs(self.root, exist_ok=True)
+        rec = {"key": key, "output": output, "files": {p: file_hash(p) for p in files if os.path.exists(p)}}
+        tmp = self._path(stage) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(rec, f, ensure_ascii=False)
+        os.replace(tmp, self._path(stage))
+        return rec
@@ -0,0 +1,244 @@
+# standin.py
+# Local stand-in for the upstream APIs, for offline and load testing of the fetchers.
+# Serves the YouTube Data API (search, videos), Reddit listings (/r/<sub>/top.json,
+# with the `after` cursor), Reddit's app-only token endpoint and thumbnails.
+# Usage:
+#   python standin.py [--port 8765] [--synthetic 1000] [--replay fixtures/] [--record fixtures/]
+#                     [--latency-ms 50] [--jitter-ms 50] [--p429 0.05] [--p5xx 0.02] [--seed 1]
+# then point the fetchers at it (printed on start):
+#   YOUTUBE_API_BASE=http://127.0.0.1:8765/youtube/v3 YOUTUBE_THUMB_BASE=http://127.0.0.1:8765
+#   REDDIT_BASE=http://127.0.0.1:8765 REDDIT_OAUTH_BASE=http://127.0.0.1:8765
+#   YOUTUBE_API_KEY=standin python baxter.py all --refresh
+# --record proxies every request to the real upstream and saves the responses as fixtures
+# (API keys and tokens are not stored); --replay serves saved fixtures, falling back to
+# synthetic data for anything not recorded. --synthetic N is the number of posts per
+# subreddit and of search results; --p429/--p5xx inject failures (429s carry Retry-After).
+
+import argparse, base64, hashlib, json, os, random, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+REAL = {"youtube": "https://www.googleapis.com", "reddit": "https://www.reddit.com",
+        "oauth": "https://oauth.reddit.com", "thumbs": "https://i.ytimg.com"}
+SECRET_PARAMS = {"key", "access_token"}
+WORDS = ("boss cat office elevator prank banana subway bodega taxi boardroom lobby coffee "
+         "cart pov intern meeting chair sticky note printer stapler reaction fail unexpected "
+         "wait for it caught on camera monday deadline zoom call tiny hat").split()
+# 1x1 grey JPEG, served as every synthetic thumbnail
+JPEG_1PX = base64.b64decode(
+    "/9j/4AAQSkZJRgABAQEASABIAAD/2wBDAAMCAgICAgMCAgIDAwMDBAYEBAQEBAgGBgUGCQgKCgkICQkKDA8MCgsOCwkJDRENDg8QEBEQCgwSExIQEw8QEBD/"
+    "wAALCAABAAEBAREA/8QAFAABAAAAAAAAAAAAAAAAAAAACf/EABQQAQAAAAAAAAAAAAAAAAAAAAD/2gAIAQEAAD8AKp//2Q==")
+
+def fixture_key(method, path, query):
+    q = sorted((k, v) for k, v in query if k not in SECRET_PARAMS)
+    return hashlib.sha1(json.dumps([method, path, q]).encode("utf-8")).hexdigest()
+
+# ---------- synthetic data ----------
+class Synthetic:
+    def __init__(self, size=1000, seed=1):
+        self.size, self.seed = size, seed
+
+    def _rnd(self, *parts):
+        return random.Random(f"{self.seed}:" + ":".join(map(str, parts)))
+
+    def title(self, rnd):
+        return " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(4, 10))).capitalize()
+
+    # Post IDs: a hash of the full subreddit name, then the post's index in base 36
+    # (so subreddits never share IDs, and a cursor maps back to its index at any size)
+    ID_PREFIX = 5
+    DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+    def post_id(self, sub, i):
+        digits = ""
+        while True:
+            i, d = divmod(i, 36)
+            digits = self.DIGITS[d] + digits
+            if not i:
+                break
+        return hashlib.sha1(sub.lower().encode("utf-8")).hexdigest()[:self.ID_PREFIX] + digits
+
+    def post_index(self, post_id):
+        return int(post_id[self.ID_PREFIX:], 36)
+
+    def post(self, sub, i):
+        rnd = self._rnd(sub, i)
+        return {"kind": "t3", "data": {
+            "id": self.post_id(sub, i), "title": self.title(rnd), "selftext": "",
+            "score": max(1, 100000 - i * 37 + rnd.randint(0, 30)), "view_count": None,
+            "domain": rnd.choice(["v.redd.it", "i.redd.it", "youtube.com", "self." + sub]),
+            "created_utc": time.time() - rnd.randint(0, 86400), "subreddit": sub}}
+
+    def listing(self, sub, query):
+        limit = min(int(query.get("limit", 25)), 100)
+        after = query.get("after")
+        start = self.post_index(after[len("t3_"):]) + 1 if after else 0   # fullname t3_<id>
+        end = min(start + limit, self.size)
+        children = [self.post(sub, i) for i in range(start, end)]
+        last = children[-1]["data"]["id"] if children else None
+        return {"kind": "Listing", "data": {"children": children,
+                                            "after": f"t3_{last}" if end < self.size else None}}
+
+    def video(self, vid):
+        rnd = self._rnd("yt", vid)
+        return {"id": vid, "snippet": {"title": self.title(rnd), "description": self.title(rnd),
+                                       "channelTitle": f"channel {rnd.randint(1, 500)}",
+                                       "publishedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() - rnd.randint(0, 86400)))},
+                "contentDetails": {"duration": f"PT{rnd.randint(10, 230)}S"},
+                "statistics": {"viewCount": str(rnd.randint(10**3, 10**7)), "likeCount": str(rnd.randint(10, 10**5))}}
+
+    def search(self, query):
+        n = min(int(query.get("maxResults", 5)), 50)
+        start = int(query.get("pageToken") or 0)
+        end = min(start + n, self.size)
+        q = hashlib.sha1(query.get("q", "").encode("utf-8")).hexdigest()[:4]
+        out = {"items": [{"id": {"kind": "youtube#video", "videoId": f"v{q}{i:06d}"}} for i in range(start, end)]}
+        if end < self.size:
+            out["nextPageToken"] = str(end)
+        return out
+
+    def videos(self, query):
+        if query.get("chart") == "mostPopular":
+            ids = [f"pop{i:05d}" for i in range(min(int(query.get("maxResults", 5)), 50))]
+        else:
+            ids = [v for v in query.get("id", "").split(",") if v]
+        return {"items": [self.video(v) for v in ids]}
+
+# ---------- server ----------
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    cfg = None   # set by serve()
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, ctype="application/json", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, obj, status=200):
+        self._send(status, json.dumps(obj).encode("utf-8"))
+
+    def _route(self, method):
+        cfg = self.cfg
+        parts = urlsplit(self.path)
+        query = parse_qsl(parts.query, keep_blank_values=True)
+        if method == "POST":
+            length = int(self.headers.get("Content-Length") or 0)
+            query += parse_qsl(self.rfile.read(length).decode("utf-8"))
+        with cfg["lock"]:
+            cfg["requests"] += 1
+            fail = cfg["rnd"].random()
+            delay = cfg["latency"] + cfg["rnd"].random() * cfg["jitter"]
+        if delay:
+            time.sleep(delay)
+        if fail < cfg["p429"]:
+            return self._send(429, b'{"error": 429, "message": "Too Many Requests"}', headers={"Retry-After": "1"})
+        if fail < cfg["p429"] + cfg["p5xx"]:
+            return self._send(503, b'{"error": 503}')
+        key = fixture_key(method, parts.path, query)
+        if cfg["record"]:
+            return self._record(method, parts, query, key)
+        if cfg["replay"]:
+            path = os.path.join(cfg["replay"], key + ".json")
+            if os.path.exists(path):
+                fx = json.load(open(path, "r", encoding="utf-8"))
+                body = base64.b64decode(fx["body_b64"]) if "body_b64" in fx else fx["body"].encode("utf-8")
+                return self._send(fx["status"], body, fx.get("content_type", "application/json"))
+        return self._synthetic(method, parts.path, dict(query))
+
+    def _synthetic(self, method, path, query):
+        syn = self.cfg["synthetic"]
+        if path.endswith("/youtube/v3/search"):
+            return self._json(syn.search(query))
+        if path.endswith("/youtube/v3/videos"):
+            return self._json(syn.videos(query))
+        if path.startswith("/r/") and path.endswith("/top") and self.headers.get("Authorization") != "bearer standin-token":
+            return self._json({"message": "Unauthorized", "error": 401}, 401)   # OAuth paths need the token
+        if path.startswith("/r/") and path.endswith(("/top.json", "/top")):
+            return self._json(syn.listing(path.split("/")[2], query))
+        if path == "/api/v1/access_token" and method == "POST":
+            return self._json({"access_token": "standin-token", "token_type": "bearer",
+                               "expires_in": 86400, "scope": "*"})
+        if path.startswith("/vi/"):
+            return self._send(200, JPEG_1PX, "image/jpeg")
+        return self._json({"error": 404, "path": path}, 404)
+
+    def _record(self, method, parts, query, key):
+        import requests
+        if parts.path.startswith("/youtube/"):
+            base = REAL["youtube"]
+        elif parts.path.startswith("/vi/"):
+            base = REAL["thumbs"]
+        elif parts.path != "/api/v1/access_token" and self.headers.get("Authorization", "").startswith("bearer"):
+            base = REAL["oauth"]
+        else:
+            base = REAL["reddit"]
+        headers = {k: v for k, v in self.headers.items() if k.lower() in ("user-agent", "authorization")}
+        if method == "POST":
+            r = requests.post(base + parts.path, data=dict(query), headers=headers, timeout=30)
+        else:
+            r = requests.get(base + parts.path, params=query, headers=headers, timeout=30)
+        ctype = r.headers.get("Content-Type", "application/json")
+        fx = {"method": method, "path": parts.path, "status": r.status_code, "content_type": ctype}
+        if parts.path == "/api/v1/access_token":
+            fx["body"] = json.dumps({"access_token": "standin-token", "token_type": "bearer", "expires_in": 86400})
+        elif ctype.startswith("application/json") or ctype.startswith("text/"):
+            fx["body"] = r.text
+        else:
+            fx["body_b64"] = base64.b64encode(r.content).decode("ascii")
+        os.makedirs(self.cfg["record"], exist_ok=True)
+        with open(os.path.join(self.cfg["record"], key + ".json"), "w", encoding="utf-8") as f:
+            json.dump(fx, f, ensure_ascii=False)
+        self._send(r.status_code, r.content, ctype)
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._route("POST")
+
+def serve(port=8765, synthetic=1000, replay=None, record=None, latency_ms=0, jitter_ms=0,
+          p429=0.0, p5xx=0.0, seed=1, host="127.0.0.1"):
+    """Start the stand-in in a background thread; returns the server (call .shutdown() to stop)."""
+    Handler.cfg = {"synthetic": Synthetic(synthetic, seed), "replay": replay, "record": record,
+                   "latency": latency_ms / 1000, "jitter": jitter_ms / 1000, "p429": p429, "p5xx": p5xx,
+                   "rnd": random.Random(seed), "lock": threading.Lock(), "requests": 0}
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def env_for(server):
+    base = f"http://{server.server_address[0]}:{server.server_address[1]}"
+    return {"YOUTUBE_API_BASE": base + "/youtube/v3", "YOUTUBE_THUMB_BASE": base,
+            "REDDIT_BASE": base, "REDDIT_OAUTH_BASE": base, "YOUTUBE_API_KEY": "standin"}
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Local stand-in for the YouTube and Reddit APIs.")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--synthetic", type=int, default=1000, help="posts per subreddit / search results")
+    ap.add_argument("--replay", help="serve recorded fixtures from this directory")
+    ap.add_argument("--record", help="proxy to the real APIs and save fixtures here")
+    ap.add_argument("--latency-ms", type=float, default=0)
+    ap.add_argument("--jitter-ms", type=float, default=0)
+    ap.add_argument("--p429", type=float, default=0.0, help="fraction of requests answered 429")
+    ap.add_argument("--p5xx", type=float, default=0.0, help="fraction of requests answered 503")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args(argv)
+    server = serve(args.port, args.synthetic, args.replay, args.record, args.latency_ms, args.jitter_ms,
+                   args.p429, args.p5xx, args.seed)
+    print("Stand-in listening; use:")
+    print(" ".join(f"{k}={v}" for k, v in env_for(server).items()))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
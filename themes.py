@@ -0,0 +1,189 @@
+# themes.py
+# Theme mining over the day's trending titles and descriptions, for seeds beyond
+# the fixed keyword vocabulary (trend_vocab.json). Texts become sparse TF-IDF
+# vectors (unigrams + bigrams, CSR arrays), clustered with spherical mini-batch
+# k-means; each cluster's heaviest terms are sorted into new settings, objects and
+# formats. Deterministic for a given input, CPU only, tens of thousands of titles in
+# a few seconds. Needs NumPy; without it mine() returns no themes.
+
+import re
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+K = 12                 # clusters (fewer for small inputs)
+MIN_DOCS = 50          # below this there is nothing to cluster
+MIN_DF = 3             # a term must appear in this many texts...
+MAX_DF = 0.2           # ...and in at most this share of them
+MAX_FEATURES = 8000
+BATCH = 512
+ITERATIONS = 60        # mini-batches
+TOP_TERMS = 8          # reported per cluster
+PHRASE_SHARE = 0.5     # see phrase()
+PER_CATEGORY = 3       # new entries per seeds category
+SEED = 7
+
+STOPWORDS = set("""
+a about after again all also am an and any are as at be because been before being but by can could
+did do does doing don down during each even ever every few for from get gets got had has have having
+he her here hers him his how i if in into is it its just let like made make many me more most my no
+nor not now of off on once one only or other our out over own really same say says see she should so
+some such than that the their them then there these they this those through to too under until up
+us very was way we well were what when where which while who why will with would yet you your yours
+new first last still back next never always ok okay yes yeah lol lmao omg wtf pls
+video videos watch shorts short clip clips full official live episode part day today week year
+funny comedy funniest hilarious laugh laughing meme memes reddit youtube tiktok subscribe channel
+viral trending best top guy guys man woman people kid kids thing things time times got gonna wanna
+""".split())
+# Words that mark a term as a place, a prop or a video format; other terms are not proposed
+SETTING_HINTS = set("""
+office elevator subway station train bus taxi cab airport plane street sidewalk park beach pool gym
+kitchen bathroom bedroom garage school classroom campus library hospital store shop market mall
+supermarket grocery bodega restaurant diner cafe coffeeshop bar pub club hotel lobby boardroom
+stadium arena court field theater cinema church bridge highway parking lot farm zoo backyard
+house apartment rooftop roof basement hallway stairs escalator warehouse factory bank
+""".split())
+OBJECT_HINTS = set("""
+banana apple pizza sandwich donut cake cookie coffee mug cup espresso tea bottle soda snack cereal
+chair stool desk table couch sofa bed pillow blanket lamp clock mirror door window curtain ladder
+box bag backpack suitcase umbrella hat tie glasses sunglasses shoe shoes sock socks jacket scarf
+phone laptop keyboard mouse monitor printer stapler tape scissors pen pencil marker notebook clipboard
+note sign poster balloon ball toy plush remote controller headphones speaker microphone camera
+vacuum cleaner broom mop bucket fan heater fridge microwave toaster blender kettle oven
+cart trolley bike scooter skateboard wheel helmet rope ribbon bell whistle trophy badge
+envelope package parcel stamp card cards dice puzzle cone bin basket tray plate fork spoon knife
+""".split())
+FORMAT_HINTS = set("""
+prank challenge reaction reacts tutorial compilation pov fail fails review unboxing duet skit sketch
+parody remix trend storytime vlog interview test experiment hack hacks asmr transformation roast
+tier ranking impression impressions vs versus blind taste
+""".split())
+# Words that are only props as the last word of a phrase ("soda can", "kite string")
+PHRASE_OBJECTS = {"can", "string"}
+
+WORD = re.compile(r"[a-z][a-z']+")
+
+def tokens(text):
+    """Non-stopword unigrams, and bigrams of two adjacent non-stopwords, of `text`."""
+    words = [w.strip("'") for w in WORD.findall((text or "").lower())]
+    words = [w if len(w) > 2 and w not in STOPWORDS else None for w in words]
+    return [w for w in words if w] + [a + " " + b for a, b in zip(words, words[1:]) if a and b and a != b]
+
+def tfidf(texts, min_df=MIN_DF, max_df=MAX_DF, max_features=MAX_FEATURES):
+    """(terms, indptr, indices, data): L2-normalised sublinear TF-IDF rows in CSR form."""
+    docs = [Counter(tokens(t)) for t in texts]
+    df = Counter(term for d in docs for term in d)
+    cap = max(min_df, int(max_df * len(docs)))
+    kept = sorted((t for t, n in df.items() if min_df <= n <= cap), key=lambda t: (-df[t], t))[:max_features]
+    vocab = {t: i for i, t in enumerate(kept)}
+    idf = np.log((1 + len(docs)) / (1 + np.array([df[t] for t in kept], dtype=np.float64))) + 1
+    indptr, indices, data = [0], [], []
+    for d in docs:
+        for t, n in d.items():
+            if t in vocab:
+                indices.append(vocab[t])
+                data.append(n)
+        indptr.append(len(indices))
+    indptr, indices = np.array(indptr, dtype=np.int64), np.array(indices, dtype=np.int64)
+    data = (1 + np.log(np.array(data, dtype=np.float64))) * idf[indices]
+    rows = np.repeat(np.arange(len(docs)), np.diff(indptr))
+    norms = np.sqrt(np.bincount(rows, weights=data ** 2, minlength=len(docs)))
+    data = data / norms[rows] if data.size else data
+    return kept, indptr, indices, data.astype(np.float32)
+
+def _rows(indptr, indices, data, ids):
+    """CSR slice for the row ids: (row position per nonzero, indices, data)."""
+    starts, ends = indptr[ids], indptr[ids + 1]
+    lens = ends - starts
+    pos = np.repeat(np.arange(len(ids)), lens)
+    nz = np.repeat(starts - np.cumsum(lens) + lens, lens) + np.arange(lens.sum())
+    return pos, indices[nz], data[nz]
+
+def similarities(centers, indptr, indices, data, ids):
+    """Dot products of rows `ids` with every center: (len(ids), k)."""
+    pos, cols, vals = _rows(indptr, indices, data, ids)
+    out = np.zeros((len(ids), len(centers)), dtype=np.float32)
+    np.add.at(out, pos, centers[:, cols].T * vals[:, None])
+    return out
+
+def kmeans(indptr, indices, data, n_terms, k=K, batch=BATCH, iterations=ITERATIONS, seed=SEED):
+    """Spherical mini-batch k-means (Sculley 2010 updates: each center is the running
+    mean of the rows assigned to it, renormalised). Returns (centers, labels)."""
+    rng = np.random.default_rng(seed)
+    nonempty = np.flatnonzero(np.diff(indptr) > 0)
+    k = min(k, len(nonempty))
+    centers = np.zeros((k, n_terms), dtype=np.float32)
+    for c, r in enumerate(rng.choice(nonempty, k, replace=False)):
+        centers[c, indices[indptr[r]:indptr[r + 1]]] = data[indptr[r]:indptr[r + 1]]
+    counts = np.ones(k)
+    for _ in range(iterations):
+        ids = rng.choice(nonempty, min(batch, len(nonempty)), replace=False)
+        labels = similarities(centers, indptr, indices, data, ids).argmax(axis=1)
+        pos, cols, vals = _rows(indptr, indices, data, ids)
+        sums = np.zeros_like(centers)
+        np.add.at(sums, (labels[pos], cols), vals)
+        n = np.bincount(labels, minlength=k)
+        moved = n > 0
+        centers[moved] = (centers[moved] * counts[moved, None] + sums[moved]) / (counts[moved] + n[moved])[:, None]
+        counts += n
+        centers /= np.maximum(np.linalg.norm(centers, axis=1, keepdims=True), 1e-12)
+    labels = np.full(len(indptr) - 1, -1)
+    for start in range(0, len(nonempty), 4096):
+        ids = nonempty[start:start + 4096]
+        labels[ids] = similarities(centers, indptr, indices, data, ids).argmax(axis=1)
+    return centers, labels
+
+def category(term):
+    """"formats", "settings" or "objects" by the hint lists (a phrase by its last word,
+    except for formats; PHRASE_OBJECTS only in a phrase); None for a term that fits none."""
+    words = term.split()
+    if any(w in FORMAT_HINTS for w in words):
+        return "formats"
+    if words[-1] in SETTING_HINTS:
+        return "settings"
+    if words[-1] in OBJECT_HINTS or (len(words) > 1 and words[-1] in PHRASE_OBJECTS):
+        return "objects"
+    return None
+
+def phrase(term, top):
+    """The heaviest of the cluster's bigrams containing `term` ("parking lot" for "lot")
+    when it carries at least PHRASE_SHARE of the term's weight, else the term."""
+    weight = dict(top)[term]
+    for t, w in top:
+        if " " in t and term in t.split() and w >= PHRASE_SHARE * weight:
+            return t
+    return term
+
+def mine(texts, known=(), k=K, per_category=PER_CATEGORY, seed=SEED):
+    """{"settings"|"objects"|"formats": [new entries], "clusters": [{"size", "terms"}]}
+    from the texts; clusters largest first, entries taken from them in that order.
+    Terms in `known` (existing labels) are not proposed again."""
+    out = {"settings": [], "objects": [], "formats": [], "clusters": []}
+    texts = list(texts)
+    if np is None or len(texts) < MIN_DOCS:
+        return out
+    terms, indptr, indices, data = tfidf(texts)
+    if not terms:
+        return out
+    centers, labels = kmeans(indptr, indices, data, len(terms), min(k, len(texts) // 20 or 1), seed=seed)
+    sizes = np.bincount(labels[labels >= 0], minlength=len(centers))
+    taken = {w for t in known for w in [t.lower()] + t.lower().split()}
+    for c in np.argsort(-sizes, kind="stable"):
+        if sizes[c] < 2:
+            continue
+        top = [(terms[i], float(centers[c, i])) for i in np.argsort(-centers[c], kind="stable")[:TOP_TERMS]
+               if centers[c, i] > 0]
+        out["clusters"].append({"size": int(sizes[c]), "terms": [t for t, _ in top]})
+        for term, _ in top:
+            term = phrase(term, top)
+            cat = category(term)
+            # One entry per cluster, its heaviest placeable term not overlapping those taken
+            if cat is None or len(out[cat]) >= per_category or any(w in taken for w in [term] + term.split()):
+                continue
+            out[cat].append(term)
+            taken.update([term] + term.split())
+            break
+    return out
@@ -0,0 +1,89 @@
+# thumbs.py
+# Local thumbnails for trending.html. Each video's thumbnail is downloaded once
+# (cached by video id in .cache/thumbs/), cropped and resized to the size the page
+# shows it at, saved as WebP and copied to public/thumbs/. With BAXTER_THUMB_SPRITE=1
+# they are packed into one sprite image instead. Needs Pillow; without it (or for a
+# thumbnail that failed) the page hotlinks YouTube's small mqdefault.jpg.
+
+import io, os, shutil, time
+
+import metrics, upstream
+
+try:
+    from PIL import Image, ImageOps  # optional: local WebP thumbnails
+except ImportError:
+    Image = None
+
+THUMB_W, THUMB_H = 160, 90
+WEBP_QUALITY = 70
+SOURCE_URL = upstream.YOUTUBE_THUMB_BASE + "/vi/{id}/mqdefault.jpg"   # 320x180, no letterbox bars
+THUMB_CACHE_DIR = os.path.join(os.getenv("BAXTER_CACHE_DIR", ".cache"), "thumbs")
+THUMB_CACHE_MAX_AGE_S = 30 * 86400
+SPRITE = os.getenv("BAXTER_THUMB_SPRITE") == "1"
+
+def hotlink(video_id):
+    return SOURCE_URL.format(id=video_id)
+
+def render(data: bytes) -> bytes:
+    """Center-crop to 16:9 and resize to THUMB_W x THUMB_H; returns WebP bytes."""
+    img = ImageOps.fit(Image.open(io.BytesIO(data)).convert("RGB"), (THUMB_W, THUMB_H), Image.LANCZOS)
+    out = io.BytesIO()
+    img.save(out, "WEBP", quality=WEBP_QUALITY, method=6)
+    return out.getvalue()
+
+def cache_path(video_id, root=THUMB_CACHE_DIR):
+    return os.path.join(root, f"{video_id}-{THUMB_W}x{THUMB_H}.webp")
+
+def fetch_missing(ids, root=THUMB_CACHE_DIR, budget: upstream.Budget = None):
+    """Download and render the thumbnails not cached yet (concurrently); returns the ids now cached."""
+    missing = [i for i in ids if not os.path.exists(cache_path(i, root))]
+    def one(video_id):
+        r = upstream.get(hotlink(video_id), timeout=10, budget=budget)
+        r.raise_for_status()
+        webp = render(r.content)
+        os.makedirs(root, exist_ok=True)
+        tmp = cache_path(video_id, root) + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(webp)
+        os.replace(tmp, cache_path(video_id, root))
+    got = upstream.gather({i: (lambda i=i: one(i)) for i in missing}, budget or upstream.Budget())
+    metrics.run.count("thumbs.cached", len(ids) - len(missing))
+    metrics.run.count("thumbs.fetched", len(got))
+    return [i for i in ids if os.path.exists(cache_path(i, root))]
+
+def prune(root=THUMB_CACHE_DIR, max_age=THUMB_CACHE_MAX_AGE_S):
+    cutoff = time.time() - max_age
+    if os.path.isdir(root):
+        for e in os.scandir(root):
+            if e.stat().st_mtime < cutoff:
+                os.remove(e.path)
+
+def write_sprite(ids, path, root=THUMB_CACHE_DIR):
+    sheet = Image.new("RGB", (THUMB_W, THUMB_H * len(ids)))
+    for k, video_id in enumerate(ids):
+        sheet.paste(Image.open(cache_path(video_id, root)), (0, k * THUMB_H))
+    sheet.save(path, "WEBP", quality=WEBP_QUALITY, method=6)
+
+def local_thumbs(ids, outdir="public", sprite=SPRITE, root=THUMB_CACHE_DIR):
+    """{video id: {"src": path relative to outdir} or {"sprite": path, "y": offset}} for the
+    thumbnails available locally; ids left out should be hotlinked."""
+    if Image is None or not ids:
+        return {}
+    ready = fetch_missing(list(dict.fromkeys(ids)), root)
+    tdir = os.path.join(outdir, "thumbs")
+    shutil.rmtree(tdir, ignore_errors=True)
+    os.makedirs(tdir, exist_ok=True)
+    for video_id in ready:
+        os.utime(cache_path(video_id, root))   # still in use: keep it out of prune()
+    prune(root)
+    if sprite and ready:
+        write_sprite(ready, os.path.join(tdir, "sprite.webp"), root)
+        metrics.run.set("bytes.thumbs", os.path.getsize(os.path.join(tdir, "sprite.webp")))
+        return {video_id: {"sprite": "thumbs/sprite.webp", "y": k * THUMB_H} for k, video_id in enumerate(ready)}
+    out = {}
+    for video_id in ready:
+        name = os.path.basename(cache_path(video_id, root))
+        shutil.copyfile(cache_path(video_id, root), os.path.join(tdir, name))
+        out[video_id] = {"src": "thumbs/" + name}
+    metrics.run.set("bytes.thumbs", sum(os.path.getsize(os.path.join(tdir, f)) for f in os.listdir(tdir)))
+    return out
@@ -0,0 +1,69 @@
+# trend_store.py
+# Persisted hourly trend counters for trends_to_seeds.py.
+# Each item is counted once, into the hour it was first seen; seeds are read
+# from exponentially decayed rolling windows, so one viral post fades out
+# instead of rewriting the whole pack.
+
+import os, json, datetime as dt
+
+STORE_PATH = os.path.join(os.getenv("BAXTER_CACHE_DIR", ".cache"), "trend_counts.json")
+KEEP_HOURS = 7 * 24
+# (window hours, half-life hours, weight)
+WINDOWS = [(24, 12.0, 1.0), (7 * 24, 72.0, 0.5)]
+
+def parse_ts(s):
+    return dt.datetime.fromisoformat(s.rstrip("Z")) if s else None
+
+def hour_key(t):
+    return t.strftime("%Y-%m-%dT%H")
+
+class TrendStore:
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        self.seen = {}      # item key -> hour first seen
+        self.buckets = {}   # hour -> {category: {label: count}}
+        if os.path.exists(path):
+            try:
+                data = json.load(open(path, "r", encoding="utf-8"))
+                self.seen, self.buckets = data.get("seen", {}), data.get("buckets", {})
+            except Exception:
+                pass
+
+    def is_new(self, key):
+        return key not in self.seen
+
+    def mark(self, key, hour):
+        self.seen[key] = hour
+
+    def bump(self, hour, counts):
+        """Add {category: Counter} into the bucket for `hour`."""
+        bucket = self.buckets.setdefault(hour, {})
+        for cat, counter in counts.items():
+            row = bucket.setdefault(cat, {})
+            for label, n in counter.items():
+                row[label] = row.get(label, 0) + n
+
+    def prune(self, now, keep_hours=KEEP_HOURS):
+        cutoff = hour_key(now - dt.timedelta(hours=keep_hours))
+        self.buckets = {h: b for h, b in self.buckets.items() if h >= cutoff}
+        self.seen = {k: h for k, h in self.seen.items() if h >= cutoff}
+
+    def scores(self, now, windows=WINDOWS):
+        """{category: {label: decayed score}} summed over the rolling windows."""
+        out = {}
+        for hour, bucket in self.buckets.items():
+            age = (now - dt.datetime.strptime(hour, "%Y-%m-%dT%H")).total_seconds() / 3600.0
+            w = sum(weight * 0.5 ** (max(age, 0.0) / half_life)
+                    for span, half_life, weight in windows if age <= span)
+            if not w:
+                continue
+            for cat, row in bucket.items():
+                acc = out.setdefault(cat, {})
+                for label, n in row.items():
+                    acc[label] = acc.get(label, 0.0) + w * n
+        return out
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"seen": self.seen, "buckets": self.buckets}, f, ensure_ascii=False)
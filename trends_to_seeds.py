@@ -1,78 +1,229 @@
 
-import os, json, re, requests
+import os, json, re, math, random
+from bisect import bisect_right
 from collections import Counter
-import praw
 
-YOUTUBE_KEY = os.getenv("YOUTUBE_API_KEY")
-REDDIT_ID = os.getenv("REDDIT_CLIENT_ID")
-REDDIT_SECRET = os.getenv("REDDIT_CLIENT_SECRET")
-REDDIT_UA = os.getenv("REDDIT_USER_AGENT", "baxter-trends/1.0")
+import ingest, metrics, themes, trend_store
+
+VOCAB_PATH = "trend_vocab.json"
+# Streamed posts past the snapshot that theme clustering sees, sampled uniformly
+THEME_SAMPLE = int(os.getenv("BAXTER_THEME_SAMPLE", "5000"))
 
 def normalize(s):
-    import re as _re
-    s = _re.sub(r"[#@]", "", s or "")
-    s = _re.sub(r"\s+", " ", s).strip()
+    s = re.sub(r"[#@]", "", s or "")
+    s = re.sub(r"\s+", " ", s).strip()
     return s
 
-def yt_trending(region="US", max_items=30):
-    if not YOUTUBE_KEY: return []
-    url = ("https://www.googleapis.com/youtube/v3/videos"
-           "?part=snippet&chart=mostPopular"
-           f"&regionCode={region}&maxResults=50&key={YOUTUBE_KEY}")
-    try:
-        r = requests.get(url, timeout=20); r.raise_for_status()
-        items = r.json().get("items", [])[:max_items]
-        out = []
-        for it in items:
-            sn = it.get("snippet", {})
-            out.append({"source":"youtube", "title":normalize(sn.get("title","")), "desc":normalize(sn.get("description",""))[:160]})
-        return out
-    except Exception:
-        return []
-
-def reddit_top_day(subs=("funny","contagiouslaughter","MadeMeSmile"), limit=30):
-    if not (REDDIT_ID and REDDIT_SECRET): return []
-    try:
-        reddit = praw.Reddit(client_id=REDDIT_ID, client_secret=REDDIT_SECRET, user_agent=REDDIT_UA)
-        out = []
-        for s in subs:
-            for p in reddit.subreddit(s).top(time_filter="day", limit=limit):
-                out.append({"source":f"r/{s}", "title": normalize(p.title)})
-        return out
-    except Exception:
-        return []
-
-def extract_patterns(items):
-    hooks, settings, objects, formats = [], [], [], []
-    for it in items:
-        t = (it.get("title","") + " " + it.get("desc","")).lower()
-        if "pov" in t:
-            hooks.append("POV-style cold open")
-        if any(w in t for w in ["office","elevator","subway","boardroom","taxi","bodega","lobby","corridor","coffee cart"]):
-            import re as _re
-            settings += _re.findall(r"(office|elevator|subway|boardroom|taxi|bodega|lobby|corridor|coffee cart)", t)
-        if any(w in t for w in ["prank","trick","swap","fake","sticker","duet","reaction","meme"]):
-            formats.append("prank / bait-and-switch")
-        if any(w in t for w in ["banana","bagel","chair","box","note","coffee","badge","briefcase"]):
-            import re as _re
-            objects += _re.findall(r"(banana|bagel|chair|box|note|coffee|badge|briefcase)", t)
-    top = lambda xs, n=6: [k for k,_ in Counter(xs).most_common(n)]
-    return {
-        "hooks": top(hooks,3) or ["POV-style cold open"],
-        "settings": top(settings,6) or ["office","elevator","subway","boardroom","bodega","taxi"],
-        "objects": top(objects,6) or ["banana","chair","box","note","coffee","briefcase"],
-        "formats": top(formats,3) or ["prank / bait-and-switch"]
-    }
+def yt_trending(items, max_items=30):
+    out = []
+    for it in [it for it in items if "yt_popular" in it.get("feeds", [])][:max_items]:
+        out.append({"source":"youtube", "title":normalize(it["title"]), "desc":normalize(it["description"])[:160],
+                    "score": it["score"], "views": it["views"], "key": "youtube:" + it["id"]})
+    return out
 
-def main():
+def reddit_top_day(items, subs=("funny","contagiouslaughter","MadeMeSmile"), limit=30):
+    out = []
+    for s in subs:
+        posts = [it for it in items if it["platform"] == "reddit" and it.get("subreddit","").lower() == s.lower()]
+        for p in posts[:limit]:
+            out.append({"source":f"r/{s}", "title": normalize(p["title"]), "score": p["score"], "views": p["views"],
+                        "key": "reddit:" + p["id"]})
+    return out
+
+# ---------- keyword matching ----------
+# trend_vocab.json: per category, a count mode ("item": once per item, "occurrence":
+# every hit), how many labels to keep, defaults, and label -> needles.
+def load_vocab(path=VOCAB_PATH):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def trie_pattern(words):
+    """Regex equivalent to longest-first alternation of `words`, factored into a
+    prefix trie so the engine branches on one character at a time."""
+    trie = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+    def build(node):
+        alts = [re.escape(ch) + build(sub) for ch, sub in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        return f"(?:{body})?" if "" in node else body
+    return build(trie)
+
+class KeywordMatcher:
+    """Every needle of every category in one compiled trie regex (longest match wins),
+    so a single scan tags all categories. A hit also credits needles of other
+    categories contained in it ("coffee cart" counts the object "coffee" too), as
+    separate per-category scans would."""
+
+    def __init__(self, vocab):
+        self.vocab = vocab
+        hits = {}
+        for cat, spec in vocab.items():
+            for label, needles in spec["terms"].items():
+                for nd in needles:
+                    hits.setdefault(nd.lower(), []).append((cat, label))
+        needles = sorted(hits, key=len, reverse=True)
+        self.regex = re.compile(trie_pattern(needles))
+        self.tags = {}
+        for nd in needles:
+            own = {cat for cat, _ in hits[nd]}
+            self.tags[nd] = list(hits[nd]) + [tag for other in needles if other != nd and other in nd
+                                               for tag in hits[other] if tag[0] not in own]
+        self.item_mode = {cat for cat, spec in vocab.items() if spec["mode"] == "item"}
+
+    def count(self, texts, weights=None):
+        """{category: Counter(label -> weighted hits)} from one scan over all texts."""
+        starts, pos = [], 0
+        for t in texts:
+            starts.append(pos)
+            pos += len(t) + 1
+        blob = "\n".join(texts).lower()
+        counts = {cat: Counter() for cat in self.vocab}
+        seen = set()
+        for m in self.regex.finditer(blob):
+            i = bisect_right(starts, m.start()) - 1
+            w = weights[i] if weights is not None else 1
+            for cat, label in self.tags[m.group()]:
+                if cat in self.item_mode:
+                    if (i, cat, label) in seen: continue
+                    seen.add((i, cat, label))
+                counts[cat][label] += w
+        return counts
+
+_matcher = None
+
+def matcher():
+    global _matcher
+    if _matcher is None:
+        _matcher = KeywordMatcher(load_vocab())
+    return _matcher
+
+# Per-item weights; log-damped so one viral post can't outvote everything else
+WEIGHTS = {
+    "count": None,
+    "score": lambda it: 1 + math.log1p(max(int(it.get("score", 0) or 0), 0)),
+    "views": lambda it: 1 + math.log1p(max(int(it.get("views", 0) or 0), 0)),
+}
+
+def count_patterns(items, weight="count"):
+    texts = [it.get("title","") + " " + it.get("desc","") for it in items]
+    fn = WEIGHTS[weight]
+    return matcher().count(texts, [fn(it) for it in items] if fn else None)
+
+def extract_patterns(items, weight="count"):
+    counts = count_patterns(items, weight)
+    return {cat: [k for k,_ in counts[cat].most_common(spec["top"])] or spec["default"]
+            for cat, spec in matcher().vocab.items()}
+
+# ---------- incremental counters ----------
+def update_store(store, items, now, weight="count"):
+    """Count only items the store hasn't seen yet, into the current hour. Returns how many."""
+    fresh = {}
+    for it in items:     # a key can repeat within a batch (a post shifting onto the next page)
+        if it["key"] not in fresh and store.is_new(it["key"]):
+            fresh[it["key"]] = it
+    fresh = list(fresh.values())
+    hour = trend_store.hour_key(now)
+    if fresh:
+        store.bump(hour, count_patterns(fresh, weight))
+    for it in fresh:
+        store.mark(it["key"], hour)
+    store.prune(now)
+    return len(fresh)
+
+def patterns_from_store(store, now):
+    scores = store.scores(now)
+    out = {}
+    for cat, spec in matcher().vocab.items():
+        ranked = sorted(scores.get(cat, {}).items(), key=lambda kv: (-kv[1], kv[0]))
+        out[cat] = [k for k,_ in ranked[:spec["top"]]] or spec["default"]
+    return out
+
+def streamed(rows):
+    """Pool items from a batch of ingest's streamed Reddit posts (ingest.read_stream)."""
+    return [{"source": r["source"], "title": normalize(r["title"]), "desc": normalize(r["description"])[:160],
+             "score": r["score"], "views": r["views"], "key": f"{r['platform']}:{r['id']}"} for r in rows]
+
+# ---------- theme mining ----------
+# Clusters of the day's titles (themes.py) add settings/objects/formats that the
+# keyword vocabulary doesn't know; BAXTER_THEMES=0 turns it off.
+THEME_CATEGORIES = ("settings", "objects", "formats")
+
+def mine_themes(texts, patterns):
+    """Run themes.mine over `texts` and append its new entries to `patterns` (in place)."""
+    if os.getenv("BAXTER_THEMES", "1") == "0":
+        return {"clusters": []}
+    known = [t for spec in matcher().vocab.values() for label, needles in spec["terms"].items() for t in [label] + needles]
+    known += [label for labels in patterns.values() for label in labels]
+    with metrics.run.stage("themes"):
+        found = themes.mine(texts, known)
+    for cat in THEME_CATEGORIES:
+        patterns[cat] = list(patterns.get(cat, [])) + [t for t in found[cat] if t not in patterns.get(cat, [])]
+        metrics.run.set(f"themes.{cat}", len(found[cat]))
+    metrics.run.set("themes.clusters", len(found["clusters"]))
+    return found
+
+def mine(snap):
+    """Seeds dict (as written to seeds.json) from an ingest snapshot; updates the trend store.
+    Posts streamed past the snapshot's per-subreddit cut are counted in batches; at most
+    THEME_SAMPLE of them (a reservoir sample) go to theme clustering."""
+    items = snap["items"]
     pool = []
-    pool += yt_trending()
-    pool += reddit_top_day()
-    patterns = extract_patterns(pool)
-    seeds = {"generated_from": len(pool), "patterns": patterns}
-    with open("seeds.json","w",encoding="utf-8") as f:
+    pool += yt_trending(items)
+    pool += reddit_top_day(items)
+    # Only unseen items are counted; seeds come from the decayed 24h/7d windows
+    now = trend_store.parse_ts(snap["fetched_at"])
+    weight = os.getenv("BAXTER_SEED_WEIGHT", "count")
+    texts = {it["key"]: it["title"] + " " + it.get("desc", "") for it in pool}
+    texts.update(("youtube:" + it["id"], normalize(it["title"]) + " " + normalize(it["description"])[:160])
+                 for it in items if it["platform"] == "youtube")
+    with metrics.run.stage("mine"):
+        store = trend_store.TrendStore()
+        new = update_store(store, pool, now, weight)
+        # The stream repeats the snapshot's own Reddit posts; only the rest add to the total
+        keys, extra = {it["key"] for it in pool}, 0
+        sample, rng = [], random.Random(snap["fetched_at"])
+        for rows in ingest.read_stream(snap):
+            batch = streamed(rows)
+            new += update_store(store, batch, now, weight)
+            for it in batch:
+                if it["key"] not in keys:
+                    keys.add(it["key"])
+                    extra += 1
+                    j = rng.randrange(extra)
+                    if len(sample) < THEME_SAMPLE:
+                        sample.append(it["title"] + " " + it["desc"])
+                    elif j < THEME_SAMPLE:
+                        sample[j] = it["title"] + " " + it["desc"]
+        store.save()
+        patterns = patterns_from_store(store, now)
+    found = mine_themes(list(texts.values()) + sample, patterns)
+    metrics.run.set("items.snapshot", len(items))
+    metrics.run.set("items.pool", len(pool))
+    metrics.run.set("items.streamed", extra)
+    metrics.run.set("items.theme_sample", len(sample))
+    metrics.run.set("items.new", new)
+    for cat, labels in patterns.items():
+        metrics.run.set(f"patterns.{cat}", len(labels))
+    return {"generated_from": len(pool) + extra, "new_items": new, "patterns": patterns, "themes": found["clusters"]}
+
+def write_seeds(seeds, path="seeds.json"):
+    with open(path,"w",encoding="utf-8") as f:
         json.dump(seeds, f, ensure_ascii=False, indent=2)
-    print("Wrote seeds.json with", seeds["generated_from"], "items")
+
+def main():
+    # Runs off the shared ingest snapshot (fetched here only if missing or stale)
+    with metrics.run.stage("snapshot"):
+        snap = ingest.snapshot()
+    seeds = mine(snap)
+    write_seeds(seeds)
+    metrics.run.flush("seeds")
+    print("Wrote seeds.json with", seeds["generated_from"], "items,", seeds["new_items"], "new")
 
 if __name__ == "__main__":
     main()
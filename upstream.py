@@ -0,0 +1,425 @@
+# upstream.py
+# Shared HTTP layer for the fetchers: one pooled keep-alive session, a per-run
+# deadline budget, a helper that runs independent calls concurrently so a
+# fetch stage takes about as long as its slowest call, an on-disk response
+# cache with ETag / Last-Modified revalidation, and a scheduler that keeps each
+# host under its rate limit, YouTube under its daily quota, and backs off on
+# 429 / 5xx (honoring Retry-After). Reddit calls share one app-only OAuth
+# token when credentials are set (reddit_get).
+
+import datetime, email.utils, hashlib, json, os, random, threading, time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+import metrics
+
+DEADLINE_S = float(os.getenv("BAXTER_FETCH_DEADLINE", "45"))
+MAX_WORKERS = 16
+HTTP_CACHE_DIR = os.path.join(os.getenv("BAXTER_CACHE_DIR", ".cache"), "http")
+HTTP_CACHE_MAX_BYTES = int(os.getenv("BAXTER_HTTP_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# Cache TTLs (seconds) per kind of call. 0 = always revalidate with the server.
+TTL_YT_SEARCH = 6 * 3600      # search.list costs 100 quota units
+TTL_YT_VIDEOS = 3600
+TTL_REDDIT = 15 * 60
+
+# Upstream base URLs; point them at standin.py to test offline
+YOUTUBE_API_BASE = os.getenv("YOUTUBE_API_BASE", "https://www.googleapis.com/youtube/v3").rstrip("/")
+YOUTUBE_THUMB_BASE = os.getenv("YOUTUBE_THUMB_BASE", "https://i.ytimg.com").rstrip("/")
+REDDIT_BASE = os.getenv("REDDIT_BASE", "https://www.reddit.com").rstrip("/")
+REDDIT_OAUTH_BASE = os.getenv("REDDIT_OAUTH_BASE", "https://oauth.reddit.com").rstrip("/")
+
+# Reddit app credentials; with both set, listings go through OAuth (higher rate limits)
+REDDIT_CLIENT_ID = os.getenv("REDDIT_CLIENT_ID")
+REDDIT_CLIENT_SECRET = os.getenv("REDDIT_CLIENT_SECRET")
+REDDIT_UA = os.getenv("REDDIT_USER_AGENT", "baxter-trends/1.0")
+REDDIT_TOKEN_MARGIN_S = 300     # renew this long before the token expires
+
+# Per-host token buckets: (requests per second, burst). BAXTER_RATE_LIMITS adds or
+# overrides hosts as JSON, e.g. '{"127.0.0.1:8765": [500, 500]}' for a load test.
+RATE_LIMITS = {
+    "www.googleapis.com": (5.0, 10),
+    "www.reddit.com": (1.0, 4),       # unauthenticated listings are throttled hard
+    "oauth.reddit.com": (1.5, 10),    # 100 requests/min with OAuth
+}
+RATE_LIMITS.update({h: tuple(v) for h, v in json.loads(os.getenv("BAXTER_RATE_LIMITS", "{}")).items()})
+DEFAULT_RATE = (5.0, 10)
+MAX_RETRIES = 3
+BACKOFF_BASE_S = 1.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# YouTube Data API quota: units per call, the daily allowance, and how many units
+# to keep back so cheap videos.list calls still work after search is cut off.
+YT_COSTS = {"search": 100, "videos": 1}    # by endpoint (last path segment)
+YT_DAILY_QUOTA = int(os.getenv("BAXTER_YT_DAILY_QUOTA", "10000"))
+YT_QUOTA_RESERVE = int(os.getenv("BAXTER_YT_QUOTA_RESERVE", "500"))
+YT_QUOTA_PATH = os.path.join(os.getenv("BAXTER_CACHE_DIR", ".cache"), "yt_quota.json")
+
+_session = None
+
+def session() -> requests.Session:
+    global _session
+    if _session is None:
+        s = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=MAX_WORKERS)
+        s.mount("https://", adapter)
+        s.mount("http://", adapter)
+        _session = s
+    return _session
+
+class Budget:
+    """Wall-clock budget shared by every call in a run."""
+
+    def __init__(self, seconds=DEADLINE_S):
+        self.end = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.end - time.monotonic())
+
+    def timeout(self, per_source: float) -> float:
+        """Per-call timeout: the source's own limit, cut short by the run deadline."""
+        left = self.remaining()
+        if left <= 0:
+            raise TimeoutError("fetch deadline exceeded")
+        return min(per_source, left)
+
+class HTTPCache:
+    """One JSON file per (url, params); mtime is the LRU clock. Entries past their
+    TTL are revalidated with If-None-Match / If-Modified-Since, and the least
+    recently used files are evicted once the directory exceeds `max_bytes`."""
+
+    def __init__(self, root=HTTP_CACHE_DIR, max_bytes=HTTP_CACHE_MAX_BYTES):
+        self.root, self.max_bytes = root, max_bytes
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(url, params=None):
+        blob = json.dumps([url, sorted((params or {}).items())], default=str)
+        return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.root, key + ".json")
+
+    def load(self, key):
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(self._path(key))
+            return entry
+        except (OSError, ValueError):
+            return None
+
+    def store(self, key, entry):
+        os.makedirs(self.root, exist_ok=True)
+        tmp = self._path(key) + f".{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp, self._path(key))
+        self.evict()
+
+    def evict(self):
+        with self.lock:
+            try:
+                files = [e for e in os.scandir(self.root) if e.name.endswith(".json")]
+            except OSError:
+                return
+            stats = sorted(((e.stat().st_mtime, e.stat().st_size, e.path) for e in files), reverse=True)
+            total = 0
+            for _, size, path in stats:
+                total += size
+                if total > self.max_bytes:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+def _from_entry(entry) -> requests.Response:
+    r = requests.Response()
+    r.status_code = entry["status"]
+    r.headers = CaseInsensitiveDict(entry.get("headers", {}))
+    r._content = entry["body"].encode("utf-8")
+    r.encoding = "utf-8"
+    r.url = entry.get("url", "")
+    r.from_cache = True
+    return r
+
+cache = HTTPCache()
+
+# ---------- scheduling ----------
+class QuotaExceeded(Exception):
+    pass
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate, self.burst = rate, burst
+        self.tokens, self.t = float(burst), time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self, budget: Budget = None):
+        """Take a token, sleeping until it is due (or raise if that is past the deadline)."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.t) * self.rate)
+            self.t = now
+            self.tokens -= 1
+            delay = max(-self.tokens / self.rate, self.paused_until - now, 0.0)
+        if budget is not None and delay > budget.remaining():
+            raise TimeoutError("rate limit wait exceeds the fetch deadline")
+        if delay:
+            time.sleep(delay)
+
+    def pause(self, seconds):
+        """Hold every caller of this host back for `seconds` (after a 429 or an empty allowance)."""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+_buckets, _buckets_lock = {}, threading.Lock()
+
+def bucket(host) -> TokenBucket:
+    with _buckets_lock:
+        if host not in _buckets:
+            _buckets[host] = TokenBucket(*RATE_LIMITS.get(host, DEFAULT_RATE))
+        return _buckets[host]
+
+def quota_day():
+    # The API's quota resets at midnight Pacific time
+    try:
+        from zoneinfo import ZoneInfo
+        return datetime.datetime.now(ZoneInfo("America/Los_Angeles")).date().isoformat()
+    except Exception:
+        return (datetime.datetime.utcnow() - datetime.timedelta(hours=8)).date().isoformat()
+
+class Quota:
+    """Daily YouTube quota units spent, persisted across runs."""
+
+    def __init__(self, path=YT_QUOTA_PATH, daily=YT_DAILY_QUOTA, reserve=YT_QUOTA_RESERVE):
+        self.path, self.daily, self.reserve = path, daily, reserve
+        self.lock = threading.Lock()
+        self.day, self.used = quota_day(), 0
+        try:
+            data = json.load(open(path, "r", encoding="utf-8"))
+            if data.get("day") == self.day:
+                self.used = data.get("used", 0)
+        except (OSError, ValueError):
+            pass
+
+    def remaining(self):
+        return max(0, self.daily - self.used)
+
+    def spend(self, units):
+        """Charge `units`; calls costing more than one unit must also leave the reserve."""
+        with self.lock:
+            if quota_day() != self.day:
+                self.day, self.used = quota_day(), 0
+            need = units + (self.reserve if units > 1 else 0)
+            if self.daily - self.used < need:
+                raise QuotaExceeded(f"YouTube quota: {self.remaining()} units left, call needs {need}")
+            self.used += units
+            self._save()
+        metrics.run.set("youtube.quota_used_today", self.used)
+
+    def exhaust(self):
+        with self.lock:
+            self.used = max(self.used, self.daily)
+            self._save()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"day": self.day, "used": self.used}, f)
+
+quota = Quota()
+
+class RedditToken:
+    """App-only (client credentials) OAuth token, requested once and shared by every
+    Reddit call in the process until it is about to expire. Kept in memory only, so
+    it never lands in the on-disk caches."""
+
+    def __init__(self, client_id=REDDIT_CLIENT_ID, secret=REDDIT_CLIENT_SECRET, user_agent=REDDIT_UA):
+        self.client_id, self.secret, self.user_agent = client_id, secret, user_agent
+        self.lock = threading.Lock()
+        self.token, self.expires = None, 0.0
+        self.failed = False
+
+    def available(self) -> bool:
+        return bool(self.client_id and self.secret) and not self.failed
+
+    def get(self, budget: Budget = None) -> str:
+        """The current token, requesting a new one if needed (429 / 5xx retried like _send)."""
+        with self.lock:
+            if self.token and time.time() < self.expires - REDDIT_TOKEN_MARGIN_S:
+                return self.token
+            url = REDDIT_BASE + "/api/v1/access_token"
+            host = urlsplit(url).netloc
+            for attempt in range(MAX_RETRIES + 1):
+                bucket(host).acquire(budget)
+                t0 = time.perf_counter()
+                r = session().post(url, auth=(self.client_id, self.secret), data={"grant_type": "client_credentials"},
+                                   headers={"User-Agent": self.user_agent},
+                                   timeout=budget.timeout(15) if budget is not None else 15)
+                metrics.run.http(host, r.status_code, time.perf_counter() - t0, len(r.content))
+                delay = backoff(r, attempt, budget)
+                if delay is None:
+                    break
+                metrics.run.count(f"retries.{host}")
+                bucket(host).pause(delay)
+            r.raise_for_status()
+            data = r.json()
+            if "access_token" not in data:
+                raise requests.HTTPError(f"Reddit token: {data.get('error', 'no access_token')}", response=r)
+            self.token, self.expires = data["access_token"], time.time() + float(data.get("expires_in", 3600))
+            metrics.run.count("reddit.tokens")
+            return self.token
+
+    def invalidate(self):
+        with self.lock:
+            self.token, self.expires = None, 0.0
+
+reddit_token = RedditToken()
+
+def reddit_get(path, params=None, timeout=15, budget: Budget = None, ttl=TTL_REDDIT) -> requests.Response:
+    """GET a Reddit API path (e.g. /r/funny/top): through oauth.reddit.com with the
+    shared app token when credentials are set, else the public .json endpoint. If the
+    token can't be had, the run falls back to the public endpoint."""
+    headers = {"User-Agent": REDDIT_UA}
+    if reddit_token.available():
+        for attempt in range(2):
+            try:
+                token = reddit_token.get(budget)
+            except requests.RequestException as e:
+                # Rejected credentials: public endpoint for the rest of the run. Anything
+                # else (still 429 / 5xx after retries, network): public endpoint for this call.
+                if getattr(e, "response", None) is not None and e.response.status_code in (400, 401, 403):
+                    reddit_token.failed = True
+                metrics.run.error("reddit_token", e)
+                break
+            r = get(REDDIT_OAUTH_BASE + path, params=params, headers=dict(headers, Authorization="bearer " + token),
+                    timeout=timeout, budget=budget, ttl=ttl)
+            if r.status_code != 401 or attempt:
+                return r
+            reddit_token.invalidate()     # revoked or expired early: get a new one once
+    return get(REDDIT_BASE + path + ".json", params=params, headers=headers, timeout=timeout,
+               budget=budget, ttl=ttl)
+
+def retry_after(r) -> float:
+    """Seconds from a Retry-After header (delta-seconds or HTTP date), else 0."""
+    v = r.headers.get("Retry-After")
+    if not v:
+        return 0.0
+    try:
+        return max(0.0, float(v))
+    except ValueError:
+        try:
+            return max(0.0, email.utils.parsedate_to_datetime(v).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return 0.0
+
+def backoff(r, attempt, budget: Budget = None):
+    """Seconds to wait before retrying response `r` (Retry-After, else exponential
+    backoff with jitter), or None when it should not be retried."""
+    if r.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+        return None
+    delay = retry_after(r) or BACKOFF_BASE_S * 2 ** attempt * random.uniform(0.5, 1.0)
+    return None if budget is not None and delay > budget.remaining() else delay
+
+def _send(url, params, headers, timeout, budget: Budget = None) -> requests.Response:
+    """One scheduled GET: waits for the host's token bucket, charges YouTube quota,
+    and retries 429 / 5xx with exponential backoff (Retry-After when given) while the
+    deadline allows. Returns the last response."""
+    parts = urlsplit(url)
+    host = parts.netloc
+    cost = YT_COSTS.get(parts.path.rsplit("/", 1)[-1], 1) if url.startswith(YOUTUBE_API_BASE + "/") else 0
+    for attempt in range(MAX_RETRIES + 1):
+        bucket(host).acquire(budget)
+        if cost:
+            quota.spend(cost)
+        r = _fetch(url, params, headers, budget.timeout(timeout) if budget is not None else timeout)
+        if cost and r.status_code == 403 and b"quotaExceeded" in r.content:
+            quota.exhaust()
+        # Reddit announces its allowance; stop before it runs out instead of after
+        if r.headers.get("X-Ratelimit-Remaining") and float(r.headers["X-Ratelimit-Remaining"]) < 1:
+            bucket(host).pause(float(r.headers.get("X-Ratelimit-Reset", 60)))
+        delay = backoff(r, attempt, budget)
+        if delay is None:
+            return r
+        metrics.run.count(f"retries.{host}")
+        bucket(host).pause(delay)
+    return r
+
+def _fetch(url, params, headers, timeout):
+    """session().get, recorded in metrics.run (host, status, latency, body bytes)."""
+    host, t0 = urlsplit(url).netloc, time.perf_counter()
+    try:
+        r = session().get(url, params=params, headers=headers, timeout=timeout)
+    except Exception as e:
+        metrics.run.http(host, type(e).__name__, time.perf_counter() - t0)
+        raise
+    metrics.run.http(host, r.status_code, time.perf_counter() - t0, len(r.content),
+                     "revalidated" if r.status_code == 304 else "miss")
+    return r
+
+def _stale(url, entry):
+    metrics.run.http(urlsplit(url).netloc, entry["status"], 0.0, cache="stale")
+    return _from_entry(entry)
+
+def get(url, params=None, headers=None, timeout=15, budget: Budget = None, ttl=None) -> requests.Response:
+    """Scheduled GET through the shared session (see _send). With `ttl` (seconds),
+    successful responses are cached on disk: fresh entries are served without a
+    request, stale ones are revalidated and reused on 304 Not Modified, and also
+    served when the call is out of quota or still failing after its retries."""
+    if ttl is None:
+        return _send(url, params, headers, timeout, budget)
+    key = cache.key(url, params)
+    entry = cache.load(key)
+    if entry and time.time() - entry["fetched_at"] < ttl:
+        metrics.run.http(urlsplit(url).netloc, entry["status"], 0.0, cache="fresh")
+        return _from_entry(entry)
+    headers = dict(headers or {})
+    if entry:
+        if entry["headers"].get("ETag"):
+            headers["If-None-Match"] = entry["headers"]["ETag"]
+        if entry["headers"].get("Last-Modified"):
+            headers["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+    try:
+        r = _send(url, params, headers, timeout, budget)
+    except (QuotaExceeded, TimeoutError, requests.RequestException):
+        if not entry:
+            raise
+        return _stale(url, entry)
+    if entry and (r.status_code in RETRY_STATUSES or (r.status_code == 403 and b"quotaExceeded" in r.content)):
+        return _stale(url, entry)
+    if r.status_code == 304 and entry:
+        entry["fetched_at"] = time.time()
+        cache.store(key, entry)
+        return _from_entry(entry)
+    if r.ok:
+        keep = {k: r.headers[k] for k in ("ETag", "Last-Modified", "Content-Type") if k in r.headers}
+        cache.store(key, {"url": url, "status": r.status_code, "headers": keep,
+                          "body": r.text, "fetched_at": time.time()})
+    return r
+
+def gather(calls: Dict[str, Callable], budget: Budget = None) -> Dict[str, object]:
+    """Run zero-arg callables concurrently; returns {name: result} for the calls that
+    finished without raising before the deadline. Failed or late calls are left out
+    (and recorded in metrics.run.errors)."""
+    if not calls:
+        return {}
+    pool = ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(calls)))
+    futures = {pool.submit(fn): name for name, fn in calls.items()}
+    done, _ = wait(futures, timeout=budget.remaining() if budget is not None else None)
+    pool.shutdown(wait=False, cancel_futures=True)
+    out = {}
+    for fut, name in futures.items():
+        if fut not in done:
+            metrics.run.error(name, TimeoutError("fetch deadline exceeded"))
+        elif fut.exception() is not None:
+            metrics.run.error(name, fut.exception())
+        else:
+            out[name] = fut.result()
+    return out